@@ -0,0 +1,191 @@
+"""
+    This python file runs parameter sweeps of the optimizers implemented in optimizers.py.
+    A sweep is declared as a list of optimizer grids (see SWEEPS below). Every combination of the parameter values is
+    run number_of_tests times in a process pool (see evaluation.run_tests_parallel).
+
+    Every single run is stored as one JSON line in RESULT_PATH: optimizer, parameters, vectorized, test number, seed,
+    time, best altitude, success, number of fitness evaluations, host and date.
+    Runs which are already stored are skipped, so an interrupted sweep is resumed by starting it again.
+     - run_sweep        Runs all missing runs of a sweep and appends them to the result file
+     - load_results     Returns all stored runs (list of dicts), optionally filtered
+     - summarize        Prints average time, success rate and evaluations per stored parameter combination
+"""
+
+import json
+import zlib
+import socket
+import datetime
+import itertools
+import numpy as np
+import evaluation as eval
+from statistics import mean
+from pathlib import Path
+
+# Global vars
+RESULT_PATH = "./logfiles_evaluation/benchmark.jsonl"
+
+# Sweeps of the existing logfiles_evaluation. Every value list is swept, other values are fixed.
+SWEEPS = [
+    {"optimizer": "prs", "number_of_tests": 1000,
+     "parameters": {"number_of_evaluations": [10000, 100000, 500000, 1000000, 2000000]}},
+    {"optimizer": "hc", "number_of_tests": 1000,
+     "parameters": {"restart": [100, 1000, 10000, 30000, 50000]}},
+    {"optimizer": "pso", "number_of_tests": 100,
+     "parameters": {"number_of_particles": [50, 100], "time_steps": 50, "v_inertia": [[0, 0]],
+                    "v_best_global": 20, "v_best_local": 0, "v_swarm_center": 0, "enable_hc": True,
+                    "number_of_hc_elements": 30, "plot_enable": False}},
+    {"optimizer": "pso", "number_of_tests": 10,
+     "parameters": {"number_of_particles": 200, "time_steps": 20, "v_inertia": [[0, 0]],
+                    "v_best_global": 20, "v_best_local": 0, "v_swarm_center": 5, "enable_hc": True,
+                    "number_of_hc_elements": 30, "plot_enable": False}},
+    {"optimizer": "pso", "number_of_tests": 10,
+     "parameters": {"number_of_particles": [500, 1000], "time_steps": 20, "v_inertia": [[0, 0]],
+                    "v_best_global": 20, "v_best_local": 0, "v_swarm_center": 0, "enable_hc": True,
+                    "number_of_hc_elements": 30, "plot_enable": False}},
+    {"optimizer": "mrs", "number_of_tests": 10,
+     "parameters": {"start_level": [3, 5, 7], "beam_width": [1, 4, 16]}},
+    {"optimizer": "sa", "number_of_tests": 100,
+     "parameters": {"number_of_chains": [100, 1000], "steps": 300, "t_start": 500, "t_end": 5,
+                    "number_of_temperatures": [1, 10], "swap_interval": 5}},
+    {"optimizer": "de", "number_of_tests": 100,
+     "parameters": {"population_size": [50, 100, 200, 500, 1000], "generations": 100, "weight": 0.8,
+                    "crossover": 0.9}},
+]
+
+
+def _combinations(parameters):
+    """
+    Returns all combinations of a parameter grid. Lists are swept, all other values are fixed.
+    Use a list with one element to pass a list as fixed value (e.g. "v_inertia": [[0, 0]]).
+    :param parameters: dict parameter name -> value or list of values
+    :return: list of dicts parameter name -> value
+    """
+    names = sorted(parameters)
+    values = [parameters[name] if isinstance(parameters[name], list) else [parameters[name]] for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def _run_key(optimizer, parameters, vectorized, test):
+    """
+    Returns the key identifying a single run in the result file.
+    """
+    return json.dumps([optimizer, parameters, vectorized, test], sort_keys=True)
+
+
+def _run_seed(seed, key):
+    """
+    Returns the seed of a single run. Depends only on seed and the key of the run, so a resumed sweep uses the same
+    seeds as an uninterrupted one.
+    """
+    return int(np.random.SeedSequence([seed, zlib.crc32(key.encode())]).generate_state(1)[0])
+
+
+def load_results(result_path=RESULT_PATH, **filters):
+    """
+    Returns all stored runs.
+    :param result_path: path to the result file (JSON lines)
+    :param filters: only runs with these values, e.g. optimizer="hc"; parameter values are matched as well
+    :return: list of runs (dicts)
+    """
+    rows = []
+    if not Path(result_path).is_file():
+        return rows
+
+    with open(result_path, "r") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            values = dict(row["parameters"], **row)
+            if all(values.get(name) == value for name, value in filters.items()):
+                rows.append(row)
+
+    return rows
+
+
+def run_sweep(sweeps=SWEEPS, result_path=RESULT_PATH, vectorized=True, number_of_workers=None, seed=0):
+    """
+    Runs every parameter combination of the given sweeps and appends every run to the result file.
+    Runs already stored in the result file are skipped.
+    :param sweeps: list of {"optimizer": ..., "number_of_tests": ..., "parameters": {...}}, see SWEEPS
+    :param result_path: path to the result file (JSON lines)
+    :param vectorized: use the vectorized engines of the optimizers
+    :param number_of_workers: number of worker processes (None: number of CPUs)
+    :param seed: base seed, the seed of every run is derived from it
+    :return: number of runs done
+    """
+
+    # Keys of all runs already done
+    done = set()
+    for row in load_results(result_path):
+        done.add(row["key"])
+
+    # Collect all runs which are still missing
+    tasks = []
+    rows = []
+    for sweep in sweeps:
+        for parameters in _combinations(sweep["parameters"]):
+            for test in range(sweep["number_of_tests"]):
+                key = _run_key(sweep["optimizer"], parameters, vectorized, test)
+                if key in done:
+                    continue
+                run_seed = _run_seed(seed, key)
+                tasks.append([sweep["optimizer"], parameters, run_seed, vectorized])
+                rows.append({"key": key, "optimizer": sweep["optimizer"], "parameters": parameters,
+                             "vectorized": vectorized, "test": test, "seed": run_seed})
+
+    print("BENCHMARK STARTED")
+    print("Runs already stored: ", len(done))
+    print("Runs to do: ", len(tasks))
+    if not tasks:
+        return 0
+
+    # Run and store every run as soon as it is finished
+    host = socket.gethostname()
+    Path(result_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(result_path, "a") as file:
+        for row, result in zip(rows, eval.run_tests_parallel(tasks, number_of_workers)):
+            row["time_ms"] = result[0]
+            row["best"] = result[1]
+            row["success"] = 1 if result[1] == 4556.63 else 0
+            row["evaluations"] = result[2]
+            row["host"] = host
+            row["date"] = str(datetime.datetime.now())
+            file.write(json.dumps(row) + "\n")
+            file.flush()
+
+    print("BENCHMARK FINISHED")
+    return len(tasks)
+
+
+def summarize(result_path=RESULT_PATH, **filters):
+    """
+    Prints average time, success rate and number of fitness evaluations per stored parameter combination.
+    :param result_path: path to the result file (JSON lines)
+    :param filters: only runs with these values, see load_results
+    :return: list of [optimizer, parameters, vectorized, number of runs, average time in ms, success rate in percent,
+              average number of fitness evaluations]
+    """
+
+    # Group runs by parameter combination
+    groups = {}
+    for row in load_results(result_path, **filters):
+        key = json.dumps([row["optimizer"], row["parameters"], row["vectorized"]], sort_keys=True)
+        groups.setdefault(key, []).append(row)
+
+    summary = []
+    for key, rows in groups.items():
+        evaluations = [row["evaluations"] for row in rows if row["evaluations"] is not None]
+        summary.append([rows[0]["optimizer"], rows[0]["parameters"], rows[0]["vectorized"], len(rows),
+                        mean([row["time_ms"] for row in rows]), mean([row["success"] for row in rows]) * 100,
+                        mean(evaluations) if evaluations else None])
+
+    for line in summary:
+        print(line)
+
+    return summary
+
+
+if __name__ == "__main__":
+    run_sweep()
+    summarize()
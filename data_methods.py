@@ -8,13 +8,72 @@
      - random_coords            Returns random coordinate tuple [x, y]
      - coords_to_index          Returns data structure indexes converted from given coordinates
      - get_fitness              Returns fitness (altitude) of a given x,y-location
+     - random_index_batch       Returns arrays of random data structure indexes (same distribution as random_coords)
+     - coords_to_index_batch    Returns data structure indexes converted from given coordinate arrays
+     - get_fitness_batch        Returns fitness (altitude) of given x,y-location arrays in one vectorized lookup
+     - index_to_coords          Returns coordinates converted from given data structure indexes (scalars or arrays)
+     - fitness_array            Returns the part of the data structure that get_fitness can return as 2-D array
+     - grid_shape               Returns the shape of fitness_array(data) without reading the data structure
+     - data_shape               Returns the shape of the data structure without reading it
+     - grid_geometry            Returns x_min, y_max and resolution of the data structure (own geometry or DHM200)
+     - random_index_range       Returns the largest random indexes of the data structure (own range or DHM200)
+     - FitnessOracle            Instrumented data structure: counts fitness lookups and profiles the phases of a run
+     - profile_phase            Returns a context manager timing a phase of a run (if data is a profiling FitnessOracle)
+     - MemoizedFitness          Data structure with a bounded LRU cache of fitness values in front of the lookups
+
+    Wherever a data structure is expected, an object with its own get_fitness / get_fitness_batch methods
+    (e.g. FitnessOracle, MemoizedFitness) can be used instead. get_fitness and get_fitness_batch then call these methods.
+     - parse_xyz_grid           Returns data structure (2-D array) parsed from FILE_PATH in a single pass
+     - scan_xyz_geometry        Returns resolution and extent of the grid of an .xyz file (one pass, no grid built)
+     - dhm200_geometry          Returns the geometry of the grid of parse_xyz_grid (rows from the last line, no pass)
+     - parse_xyz_grid_parallel  Same as parse_xyz_grid, line-aligned byte ranges parsed by a process pool into a .npy file
+     - load_grid                Returns data structure (2-D array), loaded from a binary cache if it is up to date
+     - open_grid_memmap         Returns data structure memory-mapped from the binary cache (shared between processes)
+     - process_context          Returns the multiprocessing context of all process pools (fork where available)
+     - attach_worker_grid       Process pool initializer: maps the binary cache in the worker (see worker_grid)
+     - worker_grid              Returns the data structure mapped by attach_worker_grid in this worker process
+     - measure_load_times       Returns cold (parse) and warm (cache) load times in ms
+     - build_basin_index        Returns local maximum (peak) and number of steps for every hill climbing start point
+     - load_basin_index         Returns basin index, loaded from its cache next to the grid cache if up to date
+     - build_max_pyramid        Returns max pyramid (multi-resolution maxima with location) of the data structure
+     - load_max_pyramid         Returns max pyramid, loaded from its cache next to the grid cache if up to date
+     - region_max               Returns highest altitude and its location in a rectangle of indexes (max pyramid)
+     - region_max_coords        Returns highest altitude and its location in a rectangle of coordinates (max pyramid)
+     - build_tiles              Writes the .xyz file as tiles with an index, resolution and extent taken from the data
+     - open_tiled_grid          Returns TiledGrid (tiles loaded on demand), tiles built first if missing or outdated
+     - TiledGrid                Data structure of lazily loaded tiles with a bounded tile cache (large DEMs, e.g. DHM25)
+     - load_quantized_grid      Returns QuantizedGrid, loaded from its cache next to the grid cache if up to date
+     - QuantizedGrid            Data structure of integer altitudes in cm (4 bytes per location), optional mask
 """
 
 from random import *
 import heapq
+import json
+import math
+import os
+import time
+import tempfile
+import contextlib
+import multiprocessing
+from collections import OrderedDict
+import numpy as np
 
 # Global vars
 FILE_PATH = "./data/DHM200.xyz"
+CACHE_PATH = "./data/DHM200.npy"  # Binary grid cache, written by load_grid
+CACHE_STAMP_PATH = "./data/DHM200.npy.stamp"  # Size and mtime of the source file the cache was built from
+X_MIN = 480000  # x-coordinate of the first column
+Y_MAX = 302000  # y-coordinate of the first row
+GRID_STEP = 200  # Grid resolution in m
+GRID_WIDTH = 1925  # Number of columns
+RANDOM_X_INDEX_MAX = 1925  # Largest x-index returned by random_coords (inclusive)
+RANDOM_Y_INDEX_MAX = 1140  # Largest y-index returned by random_coords (inclusive)
+BASIN_PATH = "./data/DHM200_basins.npz"  # Hill climbing basin index, written by load_basin_index
+PYRAMID_PATH = "./data/DHM200_pyramid.npz"  # Max pyramid, written by load_max_pyramid
+TILE_PATH = "./data/DHM200_tiles"  # Tiled grid (tile files and index.json), written by build_tiles
+TILE_SIZE = 256  # Number of rows and columns of a tile
+TILE_CACHE_SIZE = 64  # Maximum number of tiles a TiledGrid keeps in memory
+QUANTIZED_PATH = "./data/DHM200_cm.npz"  # Quantized grid (altitudes in cm), written by load_quantized_grid
 
 
 def get_x_list():
@@ -112,6 +171,748 @@ def generate_data_structure():
     return data
 
 
+def _xyz_blocks(file_path, block_size, start=0, end=None):
+    """
+    Reads the .xyz file given in file_path in blocks of whole lines.
+    :param file_path: path to the .xyz file
+    :param block_size: number of bytes read per block
+    :param start: first byte to read (start of a line)
+    :param end: first byte not to read (start of a line or end of file), None: end of file
+    :return: generator of arrays with one row [x, y, z] per line
+    """
+    rest = b""
+    remaining = end - start if end is not None else None
+
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        while True:
+            if remaining is None:
+                block = file.read(block_size)
+            else:
+                block = file.read(min(block_size, remaining))
+                remaining -= len(block)
+            if not block:
+                break
+
+            # Only parse complete lines, keep the rest for the next block
+            block = rest + block
+            end = block.rfind(b"\n") + 1
+            rest = block[end:]
+            if end == 0:
+                continue
+
+            yield np.fromstring(block[:end].decode("ascii"), dtype=np.float64, sep=" ").reshape(-1, 3)
+
+    # Last line without trailing newline
+    if rest.strip():
+        yield np.fromstring(rest.decode("ascii"), dtype=np.float64, sep=" ").reshape(-1, 3)
+
+
+def parse_xyz_grid(file_path=FILE_PATH, block_size=16 * 1024 * 1024):
+    """
+    Reads the file given in file_path once and writes the altitudes into a 2-D float array.
+    Same layout as generate_data_structure: rows from north (Y_MAX) to south, GRID_WIDTH columns from X_MIN,
+    zero where the file has no altitude. The file is read in blocks of whole lines, so no Python list of strings is built.
+    :param file_path: path to the .xyz file
+    :param block_size: number of bytes read per block
+    :return: data structure (numpy array, data[y_index][x_index])
+    """
+
+    # Initialize vars
+    x_blocks = []
+    y_blocks = []
+    z_blocks = []
+
+    for values in _xyz_blocks(file_path, block_size):
+        x_blocks.append(((values[:, 0] - X_MIN) / GRID_STEP).astype(np.int64))
+        y_blocks.append(((Y_MAX - values[:, 1]) / GRID_STEP).astype(np.int64))
+        z_blocks.append(values[:, 2])
+
+    x_index = np.concatenate(x_blocks)
+    y_index = np.concatenate(y_blocks)
+    z = np.concatenate(z_blocks)
+
+    # Drop points outside of the grid extent
+    inside = (x_index >= 0) & (x_index < GRID_WIDTH) & (y_index >= 0)
+    x_index = x_index[inside]
+    y_index = y_index[inside]
+    z = z[inside]
+
+    # Fill the grid, zero where there is no altitude (outside of Switzerland)
+    data = np.zeros((int(y_index.max()) + 1, GRID_WIDTH), dtype=np.float64)
+    data[y_index, x_index] = z
+
+    return data
+
+
+def _line_ranges(file_path, number_of_ranges):
+    """
+    Splits the file into byte ranges of about the same size which start and end at line boundaries.
+    :param file_path: path to the .xyz file
+    :param number_of_ranges: number of ranges
+    :return: list of [start, end] (end excluded), empty ranges are left out
+    """
+    size = os.path.getsize(file_path)
+    offsets = [0]
+
+    with open(file_path, "rb") as file:
+        for k in range(1, number_of_ranges):
+            # Move the boundary to the start of the next line
+            file.seek(max(size * k // number_of_ranges, offsets[-1]))
+            file.readline()
+            offsets.append(min(file.tell(), size))
+    offsets.append(size)
+
+    return [[start, end] for start, end in zip(offsets[:-1], offsets[1:]) if end > start]
+
+
+def _scan_range(task):
+    """
+    Scans one byte range of the .xyz file for scan_xyz_geometry (in a worker process if parallel).
+    :param task: [file_path, start, end, block_size]
+    :return: [x_min, x_max, y_min, y_max, step, first x, first y] of the range (step relative to the first point),
+             None if the range has no point
+    """
+    [file_path, start, end, block_size] = task
+    scan = None
+    for values in _xyz_blocks(file_path, block_size, start, end):
+        xs = np.rint(values[:, 0]).astype(np.int64)
+        ys = np.rint(values[:, 1]).astype(np.int64)
+        if xs.size == 0:
+            continue
+        if scan is None:
+            scan = [math.inf, -math.inf, math.inf, -math.inf, 0, int(xs[0]), int(ys[0])]
+        scan[0] = min(scan[0], int(xs.min()))
+        scan[1] = max(scan[1], int(xs.max()))
+        scan[2] = min(scan[2], int(ys.min()))
+        scan[3] = max(scan[3], int(ys.max()))
+        scan[4] = math.gcd(scan[4], int(np.gcd.reduce(np.abs(xs - scan[5]))), int(np.gcd.reduce(np.abs(ys - scan[6]))))
+    return scan
+
+
+def scan_xyz_geometry(file_path=FILE_PATH, number_of_workers=1, block_size=16 * 1024 * 1024):
+    """
+    Reads the .xyz file once (no grid is built) and returns the geometry of its grid, taken from the data: the
+    resolution is the greatest common divisor of all coordinate differences, the extent is the bounding box of all
+    points. With more than one worker, line-aligned byte ranges are scanned by a process pool.
+    :param file_path: path to the .xyz file
+    :param number_of_workers: number of processes (None: number of CPUs)
+    :param block_size: number of bytes read per block
+    :return: [x_min, y_max, step, rows, columns]
+    """
+
+    # Single process: the whole file as one range
+    context = process_context()
+    if number_of_workers is None:
+        number_of_workers = context.cpu_count()
+    if number_of_workers == 1:
+        scans = [_scan_range([file_path, 0, None, block_size])]
+    else:
+        tasks = [[file_path, start, end, block_size] for [start, end] in _line_ranges(file_path, 4 * number_of_workers)]
+        with context.Pool(number_of_workers) as pool:
+            scans = pool.map(_scan_range, tasks)
+    scans = [scan for scan in scans if scan is not None]
+    if not scans:
+        raise ValueError("No points in " + str(file_path))
+
+    # Merge the ranges: the step also divides the distances between the first points of the ranges
+    [first_x, first_y] = scans[0][5:7]
+    step = 0
+    for scan in scans:
+        step = math.gcd(step, scan[4], abs(scan[5] - first_x), abs(scan[6] - first_y))
+    step = max(step, 1)
+    x_min = min(scan[0] for scan in scans)
+    x_max = max(scan[1] for scan in scans)
+    y_min = min(scan[2] for scan in scans)
+    y_max = max(scan[3] for scan in scans)
+
+    return [x_min, y_max, step, (y_max - y_min) // step + 1, (x_max - x_min) // step + 1]
+
+
+def dhm200_geometry(file_path=FILE_PATH):
+    """
+    Returns the geometry of the grid of parse_xyz_grid without a first pass over the file: DHM200 layout (X_MIN, Y_MAX,
+    GRID_STEP, GRID_WIDTH), the number of rows is taken from the last line (DHM files run north to south).
+    :param file_path: path to the .xyz file
+    :return: [x_min, y_max, step, rows, columns]
+    """
+    with open(file_path, "rb") as file:
+        file.seek(0, os.SEEK_END)
+        file.seek(max(0, file.tell() - 4096))
+        lines = file.read().split(b"\n")
+    last = [line for line in lines if line.strip()][-1]
+    rows = int((Y_MAX - float(last.split()[1])) / GRID_STEP) + 1
+
+    return [X_MIN, Y_MAX, GRID_STEP, rows, GRID_WIDTH]
+
+
+def _parse_range(task):
+    """
+    Parses one byte range of the .xyz file in a worker process of parse_xyz_grid_parallel and writes the altitudes
+    straight into the output grid (.npy file, mapped by every worker).
+    :param task: [file_path, start, end, output_path, block_size, x_min, y_max, step]
+    :return: largest y-index of the range within the columns of the grid (-1 if none), rows beyond the grid included
+    """
+    [file_path, start, end, output_path, block_size, x_min, y_max, step] = task
+    grid = np.load(output_path, mmap_mode="r+")
+    [rows, columns] = grid.shape
+    largest_y_index = -1
+
+    for values in _xyz_blocks(file_path, block_size, start, end):
+        x_index = ((values[:, 0] - x_min) / step).astype(np.int64)
+        y_index = ((y_max - values[:, 1]) / step).astype(np.int64)
+        inside = (x_index >= 0) & (x_index < columns) & (y_index >= 0)
+        if inside.any():
+            largest_y_index = max(largest_y_index, int(y_index[inside].max()))
+        inside &= y_index < rows
+        grid[y_index[inside], x_index[inside]] = values[inside, 2]
+
+    grid.flush()
+    return largest_y_index
+
+
+def parse_xyz_grid_parallel(file_path=FILE_PATH, output_path=CACHE_PATH + ".tmp", number_of_workers=None, block_size=4 * 1024 * 1024, geometry=None):
+    """
+    Parses the .xyz file with a process pool into the grid of the given geometry. The file is split into byte ranges
+    aligned to line boundaries, every worker parses its ranges block by block and writes straight into the output grid,
+    a .npy file preallocated on disk. So neither the file nor the grid is held in memory by a single process.
+    With geometry=dhm200_geometry(file_path) (used by load_grid) the result is the same as parse_xyz_grid, the file is
+    read once. Should a point lie south of the given rows, the file is parsed again with enough rows.
+    Without geometry (unknown files), it is taken from a first pass (scan_xyz_geometry) and the grid must fit the
+    DHM200 layout: a file with another resolution or extent (e.g. DHM25) raises ValueError instead of being collapsed
+    onto it; use build_tiles / open_tiled_grid there.
+    :param file_path: path to the .xyz file
+    :param output_path: path of the output grid (.npy), e.g. the temporary file of the binary cache
+    :param number_of_workers: number of worker processes (None: number of CPUs)
+    :param block_size: number of bytes a worker reads per block
+    :param geometry: optional [x_min, y_max, step, rows, columns] of the output grid, e.g. from dhm200_geometry or
+                     scan_xyz_geometry
+    :return: data structure (numpy memmap of output_path, data[y_index][x_index])
+    """
+
+    context = process_context()
+    if number_of_workers is None:
+        number_of_workers = context.cpu_count()
+
+    # Unknown file: DHM200 layout, checked against the geometry of the data
+    if geometry is None:
+        [x_min, y_max, step, rows, columns] = scan_xyz_geometry(file_path, number_of_workers)
+        x_max = x_min + (columns - 1) * step
+        fits = step % GRID_STEP == 0 and (x_min - X_MIN) % GRID_STEP == 0 and (Y_MAX - y_max) % GRID_STEP == 0
+        if not fits or x_min < X_MIN or x_max >= X_MIN + GRID_WIDTH * GRID_STEP or y_max > Y_MAX:
+            raise ValueError("Grid of " + str(file_path) + " (resolution " + str(step) + " m, x " + str(x_min) + " - " +
+                             str(x_max) + ", y_max " + str(y_max) + ") does not fit the DHM200 grid, use build_tiles")
+        rows = (Y_MAX - (y_max - (rows - 1) * step)) // GRID_STEP + 1
+        geometry = [X_MIN, Y_MAX, GRID_STEP, rows, GRID_WIDTH]
+    [x_min, y_max, step, rows, columns] = geometry
+
+    # Preallocate the output grid on disk (zero where the file has no altitude)
+    grid = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float64, shape=(rows, columns))
+    del grid
+
+    # A few ranges per worker, so that workers finishing early take over the rest
+    tasks = [[file_path, start, end, output_path, block_size, x_min, y_max, step]
+             for [start, end] in _line_ranges(file_path, 4 * number_of_workers)]
+    with context.Pool(number_of_workers) as pool:
+        largest_y_index = max(pool.imap_unordered(_parse_range, tasks), default=-1)
+
+    # Points south of the given rows (file not sorted north to south): parse again with enough rows
+    if largest_y_index >= rows:
+        return parse_xyz_grid_parallel(file_path, output_path, number_of_workers, block_size,
+                                       [x_min, y_max, step, largest_y_index + 1, columns])
+
+    return np.load(output_path, mmap_mode="r")
+
+
+def _source_stamp(file_path):
+    """
+    Returns size and mtime of a file, used to check if the binary cache is still up to date.
+    :param file_path: path to the source file
+    :return: stamp string "size mtime_ns"
+    """
+    stat = os.stat(file_path)
+    return str(stat.st_size) + " " + str(stat.st_mtime_ns)
+
+
+def _data_stamp(file_path, data):
+    """
+    Returns the stamp of a cache derived from a data structure: source file (see _source_stamp), shape and geometry of
+    the data structure. Caches built from another data structure of the same file (e.g. the array grid and a
+    TiledGrid, which has its own shape and geometry) are not valid then.
+    :param file_path: path to the source file
+    :param data: data structure
+    :return: stamp string "size mtime_ns rows columns x_min y_max step"
+    """
+    [rows, columns] = data_shape(data)
+    [x_min, y_max, step] = grid_geometry(data)
+    return " ".join([_source_stamp(file_path)] + [str(value) for value in [rows, columns, x_min, y_max, step]])
+
+
+def _cache_is_valid(file_path, cache_path, stamp_path):
+    """
+    Checks if the binary cache exists and was built from the current source file (same size and mtime).
+    :param file_path: path to the .xyz file
+    :param cache_path: path to the binary (.npy) cache
+    :param stamp_path: path to the stamp file belonging to the cache
+    :return: True if the cache can be used
+    """
+    if not (os.path.isfile(cache_path) and os.path.isfile(stamp_path)):
+        return False
+
+    with open(stamp_path, "r") as file:
+        return file.read().strip() == _source_stamp(file_path)
+
+
+def load_grid(file_path=FILE_PATH, cache_path=CACHE_PATH, stamp_path=CACHE_STAMP_PATH, number_of_workers=1):
+    """
+    Returns the data structure. Loads the binary cache if it was built from the current source file (same size and
+    mtime), otherwise parses the source file with parse_xyz_grid and writes the cache for later runs.
+    :param file_path: path to the .xyz file
+    :param cache_path: path to the binary (.npy) cache
+    :param stamp_path: path to the stamp file belonging to the cache
+    :param number_of_workers: cold start: 1 parses in this process, otherwise the number of worker processes of
+                              parse_xyz_grid_parallel (None: number of CPUs), which write straight into the cache
+    :return: data structure (numpy array, data[y_index][x_index])
+    """
+
+    # Warm start: cache exists and belongs to the current source file
+    if _cache_is_valid(file_path, cache_path, stamp_path):
+        return np.load(cache_path)
+
+    # Cold start: parse source file and write cache. Written to a temporary file first, so that other processes
+    # never map a half written cache.
+    if number_of_workers == 1:
+        data = parse_xyz_grid(file_path)
+        with open(cache_path + ".tmp", "wb") as file:
+            np.save(file, data)
+        os.replace(cache_path + ".tmp", cache_path)
+    else:
+        parse_xyz_grid_parallel(file_path, cache_path + ".tmp", number_of_workers, geometry=dhm200_geometry(file_path))
+        os.replace(cache_path + ".tmp", cache_path)
+        data = np.load(cache_path)
+    with open(stamp_path, "w") as file:
+        file.write(_source_stamp(file_path))
+
+    return data
+
+
+def open_grid_memmap(file_path=FILE_PATH, cache_path=CACHE_PATH, stamp_path=CACHE_STAMP_PATH, number_of_workers=1):
+    """
+    Returns the data structure as read-only memory map of the binary cache (built first if missing or outdated).
+    Nothing is copied at startup and all processes mapping the same cache share one physical copy through the page
+    cache. Can be used everywhere the data structure is expected, e.g. get_fitness(data, x, y).
+    :param file_path: path to the .xyz file
+    :param cache_path: path to the binary (.npy) cache
+    :param stamp_path: path to the stamp file belonging to the cache
+    :param number_of_workers: number of parser processes if the cache is built, see load_grid
+    :return: data structure (read-only numpy memmap, data[y_index][x_index])
+    """
+
+    if not _cache_is_valid(file_path, cache_path, stamp_path):
+        load_grid(file_path, cache_path, stamp_path, number_of_workers)
+
+    return np.load(cache_path, mmap_mode="r")
+
+
+def process_context():
+    """
+    Returns the multiprocessing context used for all process pools: fork where available, so that workers do not
+    import the calling script again and inherit the data structure instead of receiving a pickled copy.
+    :return: multiprocessing context
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+# Data structure of a worker process (memory-mapped, shared through the page cache), see attach_worker_grid
+_worker_grid = None
+
+
+def attach_worker_grid(file_path=FILE_PATH, cache_path=CACHE_PATH, stamp_path=CACHE_STAMP_PATH):
+    """
+    Process pool initializer: maps the binary grid cache (open_grid_memmap) instead of receiving a pickled copy of the
+    data structure. Workers get it with worker_grid().
+    """
+    global _worker_grid
+    _worker_grid = open_grid_memmap(file_path, cache_path, stamp_path)
+
+
+def worker_grid():
+    """
+    Returns the data structure mapped by attach_worker_grid in this worker process.
+    """
+    return _worker_grid
+
+
+def measure_load_times(file_path=FILE_PATH, cache_path=CACHE_PATH, stamp_path=CACHE_STAMP_PATH, number_of_workers=1):
+    """
+    Measures the time needed to load the data structure without (cold) and with (warm) binary cache.
+    The cold run rebuilds the cache.
+    :param file_path: path to the .xyz file
+    :param cache_path: path to the binary (.npy) cache
+    :param stamp_path: path to the stamp file belonging to the cache
+    :param number_of_workers: number of parser processes of the cold run, see load_grid
+    :return: [cold time in ms, warm time in ms]
+    """
+
+    # Cold: remove stamp so that the source file is parsed and the cache rewritten
+    if os.path.isfile(stamp_path):
+        os.remove(stamp_path)
+    start = time.time()
+    load_grid(file_path, cache_path, stamp_path, number_of_workers)
+    cold = (time.time() - start) * 1000
+
+    # Warm: load from cache
+    start = time.time()
+    load_grid(file_path, cache_path, stamp_path)
+    warm = (time.time() - start) * 1000
+
+    return [cold, warm]
+
+
+def build_basin_index(data):
+    """
+    Precomputes hill climbing (as in optimizers.hill_climbing) for every start point. On a static data structure the
+    climb is deterministic: the walker always steps to the best of the four locations nearby (north, east, south, west;
+    first one wins on ties) as long as it is higher. So every location belongs to exactly one local maximum (basin).
+    :param data: data structure
+    :return: basin index {"peak": flat index of the local maximum reached, -1 if the start altitude is 0,
+                          "steps": number of steps to get there}, both 2-D arrays shaped like fitness_array(data)
+    """
+
+    grid = fitness_array(data)
+    rows, columns = grid.shape
+
+    # Fitness of the four locations nearby, 0 outside of the data structure (same as get_fitness)
+    padded = np.pad(grid, 1)
+    nearby = np.stack([padded[0:rows, 1:columns + 1],  # north
+                       padded[1:rows + 1, 2:columns + 2],  # east
+                       padded[2:rows + 2, 1:columns + 1],  # south
+                       padded[1:rows + 1, 0:columns]])  # west
+    f_index = np.argmax(nearby, axis=0)
+    f_nearby = np.take_along_axis(nearby, f_index[None], axis=0)[0]
+
+    # Next location of the climb, the location itself if it is a local maximum
+    flat_indexes = np.arange(rows * columns).reshape(rows, columns)
+    offsets = np.array([-columns, 1, columns, -1])
+    step_up = (f_nearby > grid) & (grid > 0)
+    peak = np.where(step_up, flat_indexes + offsets[f_index], flat_indexes).ravel()
+    steps = step_up.ravel().astype(np.int32)
+
+    # Pointer jumping: follow the climb in doubling strides until every location points to its local maximum
+    while True:
+        next_peak = peak[peak]
+        if np.array_equal(next_peak, peak):
+            break
+        steps = steps + steps[peak]
+        peak = next_peak
+
+    # Start points at altitude 0 do not climb
+    peak = np.where(grid.ravel() > 0, peak, -1).astype(np.int32)
+
+    return {"peak": peak.reshape(rows, columns), "steps": steps.reshape(rows, columns)}
+
+
+def _save_npz(path, **arrays):
+    """
+    Stores arrays in an .npz cache. They are written to a temporary file of its own first and then moved into place,
+    so processes which build the same cache at once do not move each other's file away (the last one wins).
+    :param path: path to the cache (.npz)
+    :param arrays: arrays to store
+    :return: None
+    """
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", suffix=".tmp", delete=False) as file:
+        np.savez(file, **arrays)
+    os.replace(file.name, path)
+
+
+def load_basin_index(data, file_path=FILE_PATH, basin_path=BASIN_PATH):
+    """
+    Returns the basin index of the data structure (see build_basin_index). Loads it from basin_path if it was built
+    from the current source file and a data structure of the same shape and geometry, otherwise builds and stores it
+    there (next to the grid cache).
+    :param data: data structure
+    :param file_path: path to the .xyz file the data structure was built from
+    :param basin_path: path to the basin index cache (.npz)
+    :return: basin index {"peak": ..., "steps": ...}
+    """
+
+    stamp = _data_stamp(file_path, data)
+
+    # Warm start: basin index belongs to the current source file and data structure
+    if os.path.isfile(basin_path):
+        with np.load(basin_path) as file:
+            if str(file["stamp"]) == stamp:
+                return {"peak": file["peak"], "steps": file["steps"]}
+
+    # Cold start: build and store basin index
+    basins = build_basin_index(data)
+    _save_npz(basin_path, peak=basins["peak"], steps=basins["steps"], stamp=np.array(stamp))
+
+    return basins
+
+
+def build_max_pyramid(data):
+    """
+    Builds a max pyramid of the data structure. Level 0 is fitness_array(data), every cell of level k is the maximum of
+    a 2x2 block of level k-1, i.e. of a 2^k x 2^k block of level 0. The top level has a single cell.
+    Every cell also stores where its maximum is (flat index into level 0).
+    :param data: data structure
+    :return: max pyramid {"values": list of 2-D arrays per level, "indexes": list of 2-D arrays per level}
+    """
+
+    grid = np.ascontiguousarray(fitness_array(data), dtype=np.float64)
+    rows, columns = grid.shape
+    values = [grid]
+    indexes = [np.arange(rows * columns, dtype=np.int32).reshape(rows, columns)]
+
+    while values[-1].size > 1:
+        value = values[-1]
+        index = indexes[-1]
+
+        # Pad to an even shape, padding never wins
+        pad = ((0, value.shape[0] % 2), (0, value.shape[1] % 2))
+        value = np.pad(value, pad, constant_values=-np.inf)
+        index = np.pad(index, pad, constant_values=-1)
+
+        # Maximum of every 2x2 block and where it comes from
+        half_rows = value.shape[0] // 2
+        half_columns = value.shape[1] // 2
+        blocks = value.reshape(half_rows, 2, half_columns, 2).transpose(0, 2, 1, 3).reshape(half_rows, half_columns, 4)
+        block_indexes = index.reshape(half_rows, 2, half_columns, 2).transpose(0, 2, 1, 3).reshape(half_rows, half_columns, 4)
+        best = np.argmax(blocks, axis=2)[..., None]
+        values.append(np.take_along_axis(blocks, best, axis=2)[..., 0])
+        indexes.append(np.take_along_axis(block_indexes, best, axis=2)[..., 0])
+
+    return {"values": values, "indexes": indexes}
+
+
+def load_max_pyramid(data, file_path=FILE_PATH, pyramid_path=PYRAMID_PATH):
+    """
+    Returns the max pyramid of the data structure (see build_max_pyramid). Loads the levels above 0 from pyramid_path
+    if they were built from the current source file and a data structure of the same shape and geometry, otherwise
+    builds and stores them there (next to the grid cache).
+    :param data: data structure
+    :param file_path: path to the .xyz file the data structure was built from
+    :param pyramid_path: path to the max pyramid cache (.npz)
+    :return: max pyramid {"values": [...], "indexes": [...]}
+    """
+
+    stamp = _data_stamp(file_path, data)
+
+    # Warm start: pyramid belongs to the current source file and data structure, level 0 is the data structure itself
+    if os.path.isfile(pyramid_path):
+        with np.load(pyramid_path) as file:
+            if str(file["stamp"]) == stamp:
+                grid = fitness_array(data)
+                rows, columns = grid.shape
+                values = [grid]
+                indexes = [np.arange(rows * columns, dtype=np.int32).reshape(rows, columns)]
+                for level in range(1, int(file["levels"]) + 1):
+                    values.append(file["values_" + str(level)])
+                    indexes.append(file["indexes_" + str(level)])
+                return {"values": values, "indexes": indexes}
+
+    # Cold start: build and store pyramid (without level 0)
+    pyramid = build_max_pyramid(data)
+    arrays = {"stamp": np.array(stamp), "levels": np.array(len(pyramid["values"]) - 1)}
+    for level in range(1, len(pyramid["values"])):
+        arrays["values_" + str(level)] = pyramid["values"][level]
+        arrays["indexes_" + str(level)] = pyramid["indexes"][level]
+    _save_npz(pyramid_path, **arrays)
+
+    return pyramid
+
+
+def region_max(pyramid, x_min, y_min, x_max, y_max):
+    """
+    Returns the highest altitude in a rectangle of indexes (bounds included) and where it is.
+    Best-first search through the max pyramid: the cell with the highest maximum is refined first, so only cells
+    which could still contain the answer are looked at.
+    :param pyramid: max pyramid, see load_max_pyramid
+    :param x_min: smallest x-index
+    :param y_min: smallest y-index
+    :param x_max: largest x-index
+    :param y_max: largest y-index
+    :return: [highest altitude, x-index, y-index], [0, None, None] if the rectangle is outside of the data structure
+    """
+
+    values = pyramid["values"]
+    indexes = pyramid["indexes"]
+    rows, columns = values[0].shape
+
+    # Clip rectangle to the data structure
+    x_min = max(x_min, 0)
+    y_min = max(y_min, 0)
+    x_max = min(x_max, columns - 1)
+    y_max = min(y_max, rows - 1)
+    if x_min > x_max or y_min > y_max:
+        return [0, None, None]
+
+    # Start with the single cell of the top level
+    top = len(values) - 1
+    heap = [(-values[top][0, 0], top, 0, 0)]
+
+    while heap:
+        [value, level, i, j] = heapq.heappop(heap)
+        size = 2 ** level
+
+        # Cell completely inside the rectangle: its maximum is the answer
+        if y_min <= i * size and (i + 1) * size - 1 <= y_max and x_min <= j * size and (j + 1) * size - 1 <= x_max:
+            y_index, x_index = divmod(int(indexes[level][i, j]), columns)
+            return [float(-value), x_index, y_index]
+
+        # Otherwise refine: children intersecting the rectangle
+        child_level = level - 1
+        child_size = size // 2
+        child_rows, child_columns = values[child_level].shape
+        for child_i in range(2 * i, min(2 * i + 2, child_rows)):
+            for child_j in range(2 * j, min(2 * j + 2, child_columns)):
+                if child_i * child_size > y_max or (child_i + 1) * child_size - 1 < y_min:
+                    continue
+                if child_j * child_size > x_max or (child_j + 1) * child_size - 1 < x_min:
+                    continue
+                heapq.heappush(heap, (-values[child_level][child_i, child_j], child_level, child_i, child_j))
+
+    return [0, None, None]
+
+
+def region_max_coords(pyramid, x1, y1, x2, y2, data=None):
+    """
+    Returns the highest altitude in a rectangle of coordinates (corners in any order, bounds included) and where it is.
+    :param pyramid: max pyramid, see load_max_pyramid
+    :param x1: x-coordinate of a corner
+    :param y1: y-coordinate of a corner
+    :param x2: x-coordinate of the opposite corner
+    :param y2: y-coordinate of the opposite corner
+    :param data: optional data structure the pyramid was built from, for its own geometry (e.g. TiledGrid)
+    :return: [highest altitude, x, y] in Swiss coordinates, [0, None, None] if the rectangle is outside
+    """
+
+    [x_index_1, y_index_1] = coords_to_index(x1, y1, data)
+    [x_index_2, y_index_2] = coords_to_index(x2, y2, data)
+    [altitude, x_index, y_index] = region_max(pyramid, min(x_index_1, x_index_2), min(y_index_1, y_index_2),
+                                              max(x_index_1, x_index_2), max(y_index_1, y_index_2))
+    if x_index is None:
+        return [altitude, None, None]
+
+    [x, y] = index_to_coords(x_index, y_index, data)
+    return [altitude, x, y]
+
+
+def _tile_name(i, j):
+    """
+    Returns the file name of the tile in tile row i and tile column j.
+    """
+    return "tile_" + str(i) + "_" + str(j) + ".npy"
+
+
+def build_tiles(file_path=FILE_PATH, tile_path=TILE_PATH, tile_size=TILE_SIZE, block_size=16 * 1024 * 1024, number_of_workers=1):
+    """
+    Writes the altitudes of the .xyz file as tiles of tile_size x tile_size (.npy files) into tile_path, plus an
+    index (index.json) with the geometry of the grid. Resolution and extent are taken from the data (scan_xyz_geometry).
+    The file is read twice in blocks (both passes by a process pool if number_of_workers > 1, see
+    parse_xyz_grid_parallel) and the grid is assembled in a temporary file, so it never has to fit in RAM.
+    Tiles without any altitude are not written.
+    :param file_path: path to the .xyz file
+    :param tile_path: directory of the tiles
+    :param tile_size: number of rows and columns of a tile
+    :param block_size: number of bytes read per block
+    :param number_of_workers: number of processes parsing the file (None: number of CPUs)
+    :return: tile index (dict)
+    """
+
+    # First pass: extent and resolution of the grid
+    [x_min, y_max, step, rows, columns] = scan_xyz_geometry(file_path, number_of_workers, block_size)
+
+    # Second pass: altitudes into a grid on disk
+    os.makedirs(tile_path, exist_ok=True)
+    grid_path = os.path.join(tile_path, "grid.tmp.npy")
+    grid = parse_xyz_grid_parallel(file_path, grid_path, number_of_workers, block_size, [x_min, y_max, step, rows, columns])
+
+    # Remove tiles of an earlier build
+    for name in os.listdir(tile_path):
+        if name.startswith("tile_") and name.endswith(".npy"):
+            os.remove(os.path.join(tile_path, name))
+
+    # Cut the grid into tiles, the last ones are padded with zeros
+    tiles = []
+    for i in range(math.ceil(rows / tile_size)):
+        for j in range(math.ceil(columns / tile_size)):
+            block = grid[i * tile_size:(i + 1) * tile_size, j * tile_size:(j + 1) * tile_size]
+            if not block.any():
+                continue
+            tile = np.zeros((tile_size, tile_size), dtype=np.float64)
+            tile[:block.shape[0], :block.shape[1]] = block
+            np.save(os.path.join(tile_path, _tile_name(i, j)), tile)
+            tiles.append([i, j])
+    del grid
+    os.remove(grid_path)
+
+    # Index last, so that an interrupted build is never used
+    index = {"stamp": _source_stamp(file_path), "x_min": x_min, "y_max": y_max, "step": step, "rows": rows,
+             "columns": columns, "tile_size": tile_size, "tiles": tiles}
+    index_path = os.path.join(tile_path, "index.json")
+    with open(index_path + ".tmp", "w") as file:
+        json.dump(index, file)
+    os.replace(index_path + ".tmp", index_path)
+
+    return index
+
+
+def open_tiled_grid(file_path=FILE_PATH, tile_path=TILE_PATH, tile_size=TILE_SIZE, max_tiles=TILE_CACHE_SIZE, number_of_workers=1):
+    """
+    Returns the data structure as TiledGrid. The tiles are built first (build_tiles) if they are missing, were built
+    from another version of the source file or with another tile size. Without source file, existing tiles are used.
+    :param file_path: path to the .xyz file
+    :param tile_path: directory of the tiles
+    :param tile_size: number of rows and columns of a tile
+    :param max_tiles: maximum number of tiles kept in memory
+    :param number_of_workers: number of processes parsing the file if the tiles are built, see build_tiles
+    :return: data structure (TiledGrid)
+    """
+
+    index_path = os.path.join(tile_path, "index.json")
+    valid = False
+    if os.path.isfile(index_path):
+        with open(index_path, "r") as file:
+            index = json.load(file)
+        valid = not os.path.isfile(file_path) or (index["stamp"] == _source_stamp(file_path) and index["tile_size"] == tile_size)
+
+    if not valid:
+        build_tiles(file_path, tile_path, tile_size, number_of_workers=number_of_workers)
+
+    return TiledGrid(tile_path, max_tiles)
+
+
+def load_quantized_grid(file_path=FILE_PATH, quantized_path=QUANTIZED_PATH, with_mask=False):
+    """
+    Returns the data structure as QuantizedGrid. Loads it from quantized_path if it was built from the current source
+    file, otherwise quantizes the grid of load_grid and stores it there (next to the grid cache).
+    :param file_path: path to the .xyz file
+    :param quantized_path: path to the quantized grid cache (.npz)
+    :param with_mask: also keep the mask of locations with an altitude
+    :return: data structure (QuantizedGrid)
+    """
+
+    stamp = _source_stamp(file_path)
+
+    # Warm start: quantized grid belongs to the current source file
+    if os.path.isfile(quantized_path):
+        with np.load(quantized_path) as file:
+            if str(file["stamp"]) == stamp:
+                return QuantizedGrid(file["centimetres"], file["mask"] if with_mask else None)
+
+    # Cold start: quantize and store (with mask, it is small)
+    quantized = QuantizedGrid.from_data(load_grid(file_path), True)
+    _save_npz(quantized_path, centimetres=quantized.centimetres, mask=quantized.mask, stamp=np.array(stamp))
+
+    if not with_mask:
+        quantized.mask = None
+    return quantized
+
+
 def best_m_values_in_list(list, m):
     """
         Returns m best elements in a list with n elements
@@ -126,29 +927,45 @@ def best_m_values_in_list(list, m):
     return heapq.nlargest(m, list)
 
 
-def random_coords():
+def random_coords(data=None):
     """
     Generates random coordinates
+    :param data: optional data structure, used for its own geometry (e.g. TiledGrid) and to time the random number
+                 generation if it is a FitnessOracle
     :return: random coordinates as tupel [x, y]
     """
-    # must be multiple of 200, so [480'000/200, 865'000/200] -> randint*200
-    x = randint(2400, 4325) * 200
-    # must be multiple of 200, so [74'000/200, 302'000/200] -> randint*200
-    y = randint(370, 1510) * 200
+    oracle = _profiling_oracle(data)
+    if oracle is not None:
+        start = time.perf_counter()
+
+    if getattr(data, "geometry", None) is None:
+        # must be multiple of 200, so [480'000/200, 865'000/200] -> randint*200
+        x = randint(2400, 4325) * 200
+        # must be multiple of 200, so [74'000/200, 302'000/200] -> randint*200
+        y = randint(370, 1510) * 200
+    else:
+        # Same distribution over the random index range of the data structure
+        [x_index_max, y_index_max] = random_index_range(data)
+        [x, y] = index_to_coords(randint(0, x_index_max), randint(0, y_index_max), data)
+
+    if oracle is not None:
+        oracle.phase_times["rng"] += time.perf_counter() - start
 
     return [x, y]
 
 
-def coords_to_index(x, y):
+def coords_to_index(x, y, data=None):
     """
     Converts given coordinates to corresponding indexes in data structure for data structure altitude evaluation.
     :param x: x-coordinate
     :param y: y-coordinate
+    :param data: optional data structure with its own geometry (e.g. TiledGrid), default: DHM200
     :return: (x,y)-index
     """
 
-    x_index = int((x - 480000) / 200)
-    y_index = int((302000 - y) / 200)
+    [x_min, y_max, step] = grid_geometry(data)
+    x_index = int((x - x_min) / step)
+    y_index = int((y_max - y) / step)
 
     return[x_index, y_index]
 
@@ -162,6 +979,15 @@ def get_fitness(data, x, y):
     :return: altitude (z)
     """
 
+    # Data structures with their own lookup (e.g. FitnessOracle)
+    lookup = getattr(data, "get_fitness", None)
+    if lookup is not None:
+        return lookup(x, y)
+
+    # Negative indexes are outside of the data structure as well (no wrap around to the other side)
+    if x < 0 or y < 0:
+        return 0
+
     if y >= len(data) - 1:
         return 0
 
@@ -169,3 +995,665 @@ def get_fitness(data, x, y):
         return 0
 
     return float(data[y][x])
+
+
+def random_index_batch(rng, number, data=None):
+    """
+    Generates random data structure indexes, same distribution as coords_to_index(*random_coords()).
+    :param rng: numpy random generator, e.g. numpy.random.default_rng(seed)
+    :param number: number of indexes
+    :param data: optional data structure, used for its random index range (see random_index_range) and to time the
+                 random number generation if it is a FitnessOracle
+    :return: [x-index array, y-index array]
+    """
+    [x_index_max, y_index_max] = random_index_range(data)
+    with profile_phase(data, "rng"):
+        # random_coords: x in [480'000, 865'000] -> index [0, 1925], y in [74'000, 302'000] -> index [0, 1140]
+        x_index = rng.integers(0, x_index_max, size=number, endpoint=True)
+        y_index = rng.integers(0, y_index_max, size=number, endpoint=True)
+
+    return [x_index, y_index]
+
+
+def coords_to_index_batch(xs, ys, data=None):
+    """
+    Converts given coordinate arrays to corresponding index arrays, same conversion as coords_to_index.
+    :param xs: x-coordinates (array-like)
+    :param ys: y-coordinates (array-like)
+    :param data: optional data structure with its own geometry (e.g. TiledGrid), default: DHM200
+    :return: [x-index array, y-index array]
+    """
+
+    [x_min, y_max, step] = grid_geometry(data)
+    x_index = ((np.asarray(xs) - x_min) / step).astype(np.int64)
+    y_index = ((y_max - np.asarray(ys)) / step).astype(np.int64)
+
+    return [x_index, y_index]
+
+
+def get_fitness_batch(data, xs, ys):
+    """
+    Evaluates data structure for many locations at once. xs, ys must be indexes, not coordinates! Use function
+    coords_to_index_batch(xs, ys) first. Indexes outside of the data structure (including negative ones) return 0,
+    exactly like get_fitness.
+    :param data: data structure (numpy array or memmap, lists are converted on every call)
+    :param xs: x-indexes (array-like)
+    :param ys: y-indexes (array-like)
+    :return: altitude array (z), same shape as xs
+    """
+
+    # Data structures with their own lookup (e.g. FitnessOracle)
+    lookup = getattr(data, "get_fitness_batch", None)
+    if lookup is not None:
+        return lookup(xs, ys)
+
+    grid = np.asarray(data)
+    rows, columns = grid.shape
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+
+    # Same bounds as get_fitness
+    valid = (xs >= 0) & (ys >= 0) & (xs < columns - 1) & (ys < rows - 1)
+
+    # Clipped flat indexes are always inside of the array, invalid ones are set to 0 afterwards
+    flat_indexes = np.clip(ys, 0, rows - 1) * columns + np.clip(xs, 0, columns - 1)
+    fitness = np.where(valid, grid.ravel().take(flat_indexes), 0.0)
+
+    return fitness
+
+
+def index_to_coords(x_index, y_index, data=None):
+    """
+    Converts given data structure indexes to coordinates, inverse of coords_to_index. Works for scalars and arrays.
+    :param x_index: x-index
+    :param y_index: y-index
+    :param data: optional data structure with its own geometry (e.g. TiledGrid), default: DHM200
+    :return: [x, y]
+    """
+
+    [x_min, y_max, step] = grid_geometry(data)
+    x = x_min + x_index * step
+    y = y_max - y_index * step
+
+    return [x, y]
+
+
+def fitness_array(data):
+    """
+    Returns the data structure as 2-D array, restricted to the indexes for which get_fitness returns the stored
+    altitude (get_fitness returns 0 for the last row and column). No copy for numpy data structures.
+    :param data: data structure
+    :return: 2-D array, fitness_array(data)[y][x] == get_fitness(data, x, y)
+    """
+
+    # Data structures with their own lookup (e.g. FitnessOracle)
+    lookup = getattr(data, "fitness_array", None)
+    if lookup is not None:
+        return lookup()
+
+    return np.asarray(data)[:-1, :-1]
+
+
+def grid_shape(data):
+    """
+    Returns the shape of fitness_array(data) without reading the data structure.
+    :param data: data structure
+    :return: (rows, columns)
+    """
+    [rows, columns] = data_shape(data)
+    return (rows - 1, columns - 1)
+
+
+def data_shape(data):
+    """
+    Returns the shape of the data structure (number of rows and columns, including the last ones which get_fitness
+    does not return) without reading it.
+    :param data: data structure
+    :return: (rows, columns)
+    """
+    shape = getattr(data, "shape", None)
+    if shape is not None:
+        return (shape[0], shape[1])
+    return (len(data), len(data[0]))
+
+
+def grid_geometry(data=None):
+    """
+    Returns the geometry of the data structure: its own (e.g. TiledGrid, taken from the data) or the one of DHM200.
+    :param data: optional data structure
+    :return: [x-coordinate of the first column, y-coordinate of the first row, grid resolution in m]
+    """
+    geometry = getattr(data, "geometry", None)
+    if geometry is not None:
+        return geometry
+    return [X_MIN, Y_MAX, GRID_STEP]
+
+
+def random_index_range(data=None):
+    """
+    Returns the largest random indexes (inclusive) of random_coords / random_index_batch for the data structure: its
+    own (e.g. TiledGrid: the whole grid) or the one of DHM200.
+    :param data: optional data structure
+    :return: [largest x-index, largest y-index]
+    """
+    random_index_max = getattr(data, "random_index_max", None)
+    if random_index_max is not None:
+        return random_index_max
+    return [RANDOM_X_INDEX_MAX, RANDOM_Y_INDEX_MAX]
+
+
+class FitnessOracle:
+    """
+    Instrumented data structure. Can be used instead of the data structure it wraps: all fitness lookups through
+    get_fitness, get_fitness_batch and fitness_array are counted (total, unique locations, out of bounds).
+    With profile=True the time of a run is split into the phases lookup, rng (random_coords / random_index_batch
+    called with the oracle), plotting (see profile_phase) and bookkeeping (everything else).
+    Use start() and stop() around the run and report() afterwards.
+    """
+
+    def __init__(self, data, profile=False):
+        """
+        :param data: data structure to wrap
+        :param profile: time the phases of the run (adds a little overhead to every lookup)
+        """
+        self.data = data
+        self.profile = profile
+        [self.rows, self.columns] = data_shape(data)
+        self.shape = (self.rows, self.columns)
+        self.geometry = getattr(data, "geometry", None)
+        self.random_index_max = getattr(data, "random_index_max", None)
+        self.count_total = 0
+        self.count_unique = 0
+        self.count_out_of_bounds = 0
+        self.phase_times = {"lookup": 0.0, "rng": 0.0, "plotting": 0.0}
+        self.total_time = 0.0
+        self.start_time = None
+        self._visited = bytearray(self.rows * self.columns)
+        self._visited_array = np.frombuffer(self._visited, dtype=np.uint8)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, y):
+        # Row access for code reading the shape of the data structure (len(data[0])), not counted as lookup
+        return self.data[y]
+
+    def start(self):
+        """
+        Starts the clock of the run.
+        """
+        self.start_time = time.perf_counter()
+
+    def stop(self):
+        """
+        Stops the clock of the run.
+        """
+        self.total_time += time.perf_counter() - self.start_time
+        self.start_time = None
+
+    def phase(self, name):
+        """
+        :param name: phase name, e.g. "plotting"
+        :return: context manager adding the time spent inside to the given phase
+        """
+        return _Phase(self, name)
+
+    def get_fitness(self, x, y):
+        """
+        Same as get_fitness(data, x, y) of the wrapped data structure, counted.
+        """
+        if self.profile:
+            start = time.perf_counter()
+
+        self.count_total += 1
+        if x < 0 or y < 0 or y >= self.rows - 1 or x >= self.columns - 1:
+            self.count_out_of_bounds += 1
+            fitness = 0
+        else:
+            index = y * self.columns + x
+            if not self._visited[index]:
+                self._visited[index] = 1
+                self.count_unique += 1
+            fitness = get_fitness(self.data, x, y)
+
+        if self.profile:
+            self.phase_times["lookup"] += time.perf_counter() - start
+
+        return fitness
+
+    def get_fitness_batch(self, xs, ys):
+        """
+        Same as get_fitness_batch(data, xs, ys) of the wrapped data structure, counted.
+        """
+        if self.profile:
+            start = time.perf_counter()
+
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        valid = (xs >= 0) & (ys >= 0) & (xs < self.columns - 1) & (ys < self.rows - 1)
+        self.count_total += xs.size
+        self.count_out_of_bounds += xs.size - int(np.count_nonzero(valid))
+
+        # Locations not looked up before
+        indexes = ys[valid] * self.columns + xs[valid]
+        new = np.unique(indexes[self._visited_array[indexes] == 0])
+        self._visited_array[new] = 1
+        self.count_unique += new.size
+
+        fitness = get_fitness_batch(self.data, xs, ys)
+
+        if self.profile:
+            self.phase_times["lookup"] += time.perf_counter() - start
+
+        return fitness
+
+    def fitness_array(self):
+        """
+        Same as fitness_array(data) of the wrapped data structure, counted as a lookup of every location.
+        """
+        if self.profile:
+            start = time.perf_counter()
+
+        grid = fitness_array(self.data)
+        self.count_total += grid.size
+        self.count_unique += grid.size - int(np.count_nonzero(self._visited_array.reshape(self.rows, self.columns)[:-1, :-1]))
+        self._visited_array.reshape(self.rows, self.columns)[:-1, :-1] = 1
+
+        if self.profile:
+            self.phase_times["lookup"] += time.perf_counter() - start
+
+        return grid
+
+    def report(self):
+        """
+        :return: dict with the lookup counts and the time per phase in ms (bookkeeping: total time of the run minus
+                 all other phases)
+        """
+        phases = {name: seconds * 1000 for name, seconds in self.phase_times.items()}
+        phases["bookkeeping"] = max(0.0, self.total_time * 1000 - sum(phases.values()))
+        return {"lookups": self.count_total, "unique": self.count_unique,
+                "out_of_bounds": self.count_out_of_bounds, "total_ms": self.total_time * 1000, "phases_ms": phases}
+
+
+class _Phase:
+    """
+    Context manager of FitnessOracle.phase
+    """
+
+    def __init__(self, oracle, name):
+        self.oracle = oracle
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+        self.oracle.phase_times[self.name] = self.oracle.phase_times.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+def _profiling_oracle(data):
+    """
+    :param data: data structure
+    :return: data if it is a profiling FitnessOracle, else None
+    """
+    if isinstance(data, FitnessOracle) and data.profile:
+        return data
+    return None
+
+
+def profile_phase(data, name):
+    """
+    Returns a context manager timing a phase of a run, e.g. with profile_phase(data, "plotting"): ...
+    Does nothing unless data is a profiling FitnessOracle.
+    :param data: data structure
+    :param name: phase name
+    :return: context manager
+    """
+    oracle = _profiling_oracle(data)
+    if oracle is None:
+        return contextlib.nullcontext()
+    return oracle.phase(name)
+
+
+class MemoizedFitness:
+    """
+    Data structure with a bounded memo of fitness values in front of the data structure it wraps. Can be used instead
+    of that data structure: get_fitness and get_fitness_batch answer locations looked up before from the memo, only the
+    others reach the wrapped data structure. When the memo is full, the least recently used location is evicted.
+    Locations outside of the data structure return 0 without reaching it and are not stored.
+    """
+
+    def __init__(self, data, max_size=65536):
+        """
+        :param data: data structure to wrap (e.g. an expensive oracle)
+        :param max_size: maximum number of stored fitness values
+        """
+        self.data = data
+        self.max_size = max_size
+        [self.rows, self.columns] = data_shape(data)
+        self.shape = (self.rows, self.columns)
+        self.geometry = getattr(data, "geometry", None)
+        self.random_index_max = getattr(data, "random_index_max", None)
+        self.count_total = 0
+        self.count_misses = 0
+        self.count_out_of_bounds = 0
+        self.count_evictions = 0
+        self._memo = OrderedDict()
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, y):
+        # Row access for code reading the shape of the data structure (len(data[0])), not memoized
+        return self.data[y]
+
+    def clear(self):
+        """
+        Empties the memo and resets the statistics (e.g. before every test of an evaluation).
+        """
+        self._memo.clear()
+        self.count_total = 0
+        self.count_misses = 0
+        self.count_out_of_bounds = 0
+        self.count_evictions = 0
+
+    def _store(self, keys, values):
+        """
+        Stores fitness values in the memo and evicts the least recently used ones beyond max_size.
+        """
+        memo = self._memo
+        for key, value in zip(keys, values):
+            memo[key] = value
+        while len(memo) > self.max_size:
+            memo.popitem(last=False)
+            self.count_evictions += 1
+
+    def get_fitness(self, x, y):
+        """
+        Same as get_fitness(data, x, y) of the wrapped data structure, memoized.
+        """
+        self.count_total += 1
+        if x < 0 or y < 0 or y >= self.rows - 1 or x >= self.columns - 1:
+            self.count_out_of_bounds += 1
+            return 0
+
+        key = y * self.columns + x
+        fitness = self._memo.get(key)
+        if fitness is not None:
+            self._memo.move_to_end(key)
+            return fitness
+
+        self.count_misses += 1
+        fitness = get_fitness(self.data, x, y)
+        self._store([key], [fitness])
+        return fitness
+
+    def get_fitness_batch(self, xs, ys):
+        """
+        Same as get_fitness_batch(data, xs, ys) of the wrapped data structure, memoized. All locations missing in the
+        memo are looked up in the wrapped data structure in one batch.
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        valid = (xs >= 0) & (ys >= 0) & (xs < self.columns - 1) & (ys < self.rows - 1)
+        self.count_total += xs.size
+        self.count_out_of_bounds += xs.size - int(np.count_nonzero(valid))
+
+        # Every location once, the ones in the memo are answered from it
+        [keys, inverse] = np.unique(ys[valid] * self.columns + xs[valid], return_inverse=True)
+        values = np.empty(keys.size)
+        missing = []
+        memo = self._memo
+        for n, key in enumerate(keys.tolist()):
+            value = memo.get(key)
+            if value is None:
+                missing.append(n)
+            else:
+                memo.move_to_end(key)
+                values[n] = value
+
+        # All others reach the wrapped data structure in one batch
+        if missing:
+            missing = np.array(missing)
+            missing_keys = keys[missing]
+            values[missing] = get_fitness_batch(self.data, missing_keys % self.columns, missing_keys // self.columns)
+            self.count_misses += missing.size
+            self._store(missing_keys.tolist(), values[missing].tolist())
+
+        fitness = np.zeros(xs.shape)
+        fitness[valid] = values[inverse.reshape(-1)]
+        return fitness
+
+    def fitness_array(self):
+        """
+        Same as fitness_array(data) of the wrapped data structure. Not memoized: every location reaches it.
+        """
+        grid = fitness_array(self.data)
+        self.count_total += grid.size
+        self.count_misses += grid.size
+        return grid
+
+    def report(self):
+        """
+        :return: dict with the number of lookups (raw), lookups reaching the wrapped data structure (misses), memo
+                 hits, out of bounds lookups, evictions and the number of stored values
+        """
+        return {"lookups": self.count_total, "misses": self.count_misses,
+                "hits": self.count_total - self.count_misses - self.count_out_of_bounds,
+                "out_of_bounds": self.count_out_of_bounds, "evictions": self.count_evictions,
+                "size": len(self._memo)}
+
+
+class TiledGrid:
+    """
+    Data structure stored as tiles (see build_tiles). Tiles are loaded on demand and at most max_tiles of them are kept
+    in memory, the least recently used tile is evicted. Resolution and extent come from the tile index instead of the
+    DHM200 constants (see grid_geometry), so coordinates are converted with coords_to_index(x, y, data).
+    Can be used wherever the data structure is expected. As for the array data structure, get_fitness returns 0 for
+    the last row and column, so the shape is one row and column larger than the grid of the data.
+    """
+
+    def __init__(self, tile_path=TILE_PATH, max_tiles=TILE_CACHE_SIZE):
+        """
+        :param tile_path: directory of the tiles, see build_tiles
+        :param max_tiles: maximum number of tiles kept in memory
+        """
+        with open(os.path.join(tile_path, "index.json"), "r") as file:
+            index = json.load(file)
+
+        self.tile_path = tile_path
+        self.tile_size = index["tile_size"]
+        self.max_tiles = max_tiles
+        self.geometry = [index["x_min"], index["y_max"], index["step"]]
+        self.shape = (index["rows"] + 1, index["columns"] + 1)
+        self.random_index_max = [index["columns"] - 1, index["rows"] - 1]
+        self.count_loads = 0
+        self._tile_columns = math.ceil(index["columns"] / self.tile_size)
+        self._stored = set((i, j) for [i, j] in index["tiles"])
+        self._tiles = OrderedDict()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, y):
+        # Row access (loads every tile of the row)
+        xs = np.arange(self.shape[1])
+        return self._lookup(xs, np.full(xs.shape, y))
+
+    def tile(self, i, j):
+        """
+        Returns the tile in tile row i and tile column j, loaded from disk if it is not in memory.
+        :return: 2-D array (tile_size x tile_size), None for tiles without any altitude
+        """
+        if (i, j) not in self._stored:
+            return None
+
+        tile = self._tiles.get((i, j))
+        if tile is not None:
+            self._tiles.move_to_end((i, j))
+            return tile
+
+        tile = np.load(os.path.join(self.tile_path, _tile_name(i, j)))
+        self.count_loads += 1
+        self._tiles[(i, j)] = tile
+        if len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def _lookup(self, xs, ys):
+        """
+        Returns the stored altitudes at index arrays xs, ys (0 outside of the grid), reading every tile once.
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        fitness = np.zeros(xs.shape)
+        inside = (xs >= 0) & (ys >= 0) & (xs < self.shape[1] - 1) & (ys < self.shape[0] - 1)
+        positions = np.nonzero(inside.ravel())[0]
+        x_inside = xs.ravel()[positions]
+        y_inside = ys.ravel()[positions]
+
+        # Group the locations by tile
+        tile_ids = (y_inside // self.tile_size) * self._tile_columns + x_inside // self.tile_size
+        order = np.argsort(tile_ids, kind="stable")
+        [tile_ids, starts] = np.unique(tile_ids[order], return_index=True)
+        ends = np.append(starts[1:], order.size)
+
+        flat = fitness.reshape(-1)
+        for tile_id, start, end in zip(tile_ids.tolist(), starts.tolist(), ends.tolist()):
+            tile = self.tile(tile_id // self._tile_columns, tile_id % self._tile_columns)
+            if tile is None:
+                continue
+            group = order[start:end]
+            flat[positions[group]] = tile[y_inside[group] % self.tile_size, x_inside[group] % self.tile_size]
+
+        return fitness
+
+    def get_fitness(self, x, y):
+        """
+        Same as get_fitness(data, x, y) for the tiled data structure.
+        """
+        if x < 0 or y < 0 or y >= self.shape[0] - 1 or x >= self.shape[1] - 1:
+            return 0
+
+        tile = self.tile(y // self.tile_size, x // self.tile_size)
+        if tile is None:
+            return 0
+        return float(tile[y % self.tile_size, x % self.tile_size])
+
+    def get_fitness_batch(self, xs, ys):
+        """
+        Same as get_fitness_batch(data, xs, ys) for the tiled data structure, every tile is read once per batch.
+        """
+        return self._lookup(xs, ys)
+
+    def fitness_array(self):
+        """
+        Same as fitness_array(data): the whole grid as 2-D array. Reads every tile, only for grids which fit in RAM.
+        """
+        [rows, columns] = grid_shape(self)
+        grid = np.zeros((rows, columns))
+        for (i, j) in self._stored:
+            tile = self.tile(i, j)
+            block = grid[i * self.tile_size:(i + 1) * self.tile_size, j * self.tile_size:(j + 1) * self.tile_size]
+            block[:] = tile[:block.shape[0], :block.shape[1]]
+        return grid
+
+    def coords_to_index(self, x, y):
+        """
+        Same as coords_to_index(x, y) with the geometry of the tiled data structure.
+        """
+        return coords_to_index(x, y, self)
+
+    def index_to_coords(self, x_index, y_index):
+        """
+        Same as index_to_coords(x_index, y_index) with the geometry of the tiled data structure.
+        """
+        return index_to_coords(x_index, y_index, self)
+
+
+class QuantizedGrid:
+    """
+    Data structure storing the altitudes as integer centimetres (int32, 4 bytes per location instead of 8 for a float
+    array and about 32 for a list of floats). DHM altitudes have two decimal places, so the round trip is exact:
+    get_fitness returns centimetres / 100, which is the same float as the altitude in the file (e.g. 4556.63).
+    Optionally keeps a mask of the locations with an altitude (one bit per location); get_fitness returns 0 outside.
+    Can be used wherever the data structure is expected.
+    """
+
+    def __init__(self, centimetres, mask=None):
+        """
+        :param centimetres: 2-D int32 array of altitudes in cm, same layout as the data structure
+        :param mask: optional packed mask (numpy.packbits of a 2-D bool array, rows packed separately)
+        """
+        self.centimetres = centimetres
+        self.mask = mask
+        self.shape = centimetres.shape
+        self._flat = centimetres.reshape(-1)
+
+    @classmethod
+    def from_data(cls, data, with_mask=False):
+        """
+        Quantizes a data structure.
+        :param data: data structure (altitudes with at most two decimal places)
+        :param with_mask: also keep the mask of locations with an altitude (> 0)
+        :return: QuantizedGrid
+        """
+        grid = np.asarray(data, dtype=np.float64)
+        centimetres = np.rint(grid * 100).astype(np.int32)
+        if not np.array_equal(centimetres / 100, grid):
+            raise ValueError("Altitudes with more than two decimal places can not be stored in cm exactly")
+
+        mask = np.packbits(grid > 0, axis=1) if with_mask else None
+        return cls(centimetres, mask)
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the altitudes and the mask in bytes.
+        """
+        return self.centimetres.nbytes + (self.mask.nbytes if self.mask is not None else 0)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, y):
+        # Row access in m
+        return self.centimetres[y] / 100
+
+    def get_fitness(self, x, y):
+        """
+        Same as get_fitness(data, x, y) for the quantized data structure.
+        """
+        if x < 0 or y < 0 or y >= self.shape[0] - 1 or x >= self.shape[1] - 1:
+            return 0
+        if self.mask is not None and not (self.mask[y, x >> 3] >> (7 - (x & 7))) & 1:
+            return 0
+
+        return int(self.centimetres[y, x]) / 100
+
+    def get_fitness_batch(self, xs, ys):
+        """
+        Same as get_fitness_batch(data, xs, ys) for the quantized data structure.
+        """
+        rows, columns = self.shape
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        valid = (xs >= 0) & (ys >= 0) & (xs < columns - 1) & (ys < rows - 1)
+
+        # Clipped indexes are always inside of the array, invalid ones are set to 0 afterwards
+        x_clipped = np.clip(xs, 0, columns - 1)
+        y_clipped = np.clip(ys, 0, rows - 1)
+        if self.mask is not None:
+            valid &= ((self.mask[y_clipped, x_clipped >> 3] >> (7 - (x_clipped & 7))) & 1).astype(bool)
+
+        centimetres = self._flat.take(y_clipped * columns + x_clipped)
+        return np.where(valid, centimetres / 100, 0.0)
+
+    def fitness_array(self):
+        """
+        Same as fitness_array(data): altitudes in m as 2-D float array (a copy).
+        """
+        grid = self.centimetres[:-1, :-1] / 100
+        if self.mask is not None:
+            grid[~np.unpackbits(self.mask, axis=1, count=self.shape[1]).astype(bool)[:-1, :-1]] = 0
+        return grid
@@ -2,23 +2,112 @@
     This module provides evaluation functions for each implemented optimizer.
     Returns average time and average success rate for a given number of repetitions
     Logs the mentioned value in the folder logfiles_evaluation
+
+    parallel_evaluation spreads the repetitions over a process pool, see run_optimizer for the supported optimizers.
 """
 
 import time
 import datetime
+import random
+import numpy as np
+import data_methods as dm
 import optimizers as opt
 from statistics import mean
 from pathlib import Path
 
 
-def bf_evaluation(data, number_of_tests):
+def _start_profile(data, profile):
+    """
+    Returns the data structure for a single test: an instrumented dm.FitnessOracle (clock started) if profile is True.
+    A dm.MemoizedFitness data structure starts every test with an empty memo.
+    """
+    if isinstance(data, dm.MemoizedFitness):
+        data.clear()
+    if not profile:
+        return data
+
+    oracle = dm.FitnessOracle(data, True)
+    oracle.start()
+    return oracle
+
+
+def _stop_profile(test_data, profile_list):
+    """
+    Stops the clock of the oracle of a single test and stores its report in profile_list (with the report of the
+    memo under "memo" if the data structure is a dm.MemoizedFitness).
+    """
+    report = {}
+    if isinstance(test_data, dm.FitnessOracle):
+        test_data.stop()
+        report = test_data.report()
+        test_data = test_data.data
+    if isinstance(test_data, dm.MemoizedFitness):
+        report["memo"] = test_data.report()
+    if report:
+        profile_list.append(report)
+
+
+def _profile_summary(profile_list):
+    """
+    Prints the average lookup counts and time per phase of all profiled tests, and the memo statistics of memoized
+    tests: raw lookups and lookups which reached the data structure behind the memo.
+    :param profile_list: list of dm.FitnessOracle reports (and/or memo reports, see _stop_profile)
+    :return: the printed lines (for the log file), empty if nothing was profiled
+    """
+    if not profile_list:
+        return []
+
+    lines = []
+    if "total_ms" in profile_list[0]:
+        total_time = mean([report["total_ms"] for report in profile_list])
+        lines.append("Average number of fitness lookups: " + str(mean([report["lookups"] for report in profile_list])))
+        lines.append("Average number of unique fitness lookups: " + str(mean([report["unique"] for report in profile_list])))
+        lines.append("Average number of out of bounds lookups: " + str(mean([report["out_of_bounds"] for report in profile_list])))
+        for phase in ["lookup", "rng", "bookkeeping", "plotting"]:
+            phase_time = mean([report["phases_ms"][phase] for report in profile_list])
+            share = phase_time / total_time * 100 if total_time > 0 else 0
+            lines.append("Average time " + phase + " in ms: " + str(phase_time) + " (" + str(round(share, 1)) + " %)")
+
+    if "memo" in profile_list[0]:
+        lookups = mean([report["memo"]["lookups"] for report in profile_list])
+        hits = mean([report["memo"]["hits"] for report in profile_list])
+        lines.append("Average number of fitness evaluations (raw): " + str(lookups))
+        lines.append("Average number of fitness evaluations reaching the data structure (memo misses): " + str(mean([report["memo"]["misses"] for report in profile_list])))
+        lines.append("Average number of memo hits: " + str(hits) + " (" + str(round(hits / lookups * 100 if lookups > 0 else 0, 1)) + " %)")
+        lines.append("Average number of memo evictions: " + str(mean([report["memo"]["evictions"] for report in profile_list])))
+
+    print("PROFILE")
+    for line in lines:
+        print(line)
+
+    return lines
+
+
+def _numbered_path(path, number):
+    """
+    Returns the path with the test number added to the file name (e.g. swarm.gif -> swarm_test_3.gif), None if no
+    path is given.
+    """
+    if path is None:
+        return None
+    path = Path(path)
+    return str(path.with_name(path.stem + "_test_" + str(number) + path.suffix))
+
+
+def bf_evaluation(data, number_of_tests, vectorized=False, profile=False):
     time_list = []
     success_list = []
+    profile_list = []
     print("BRUTE FORCE EVALUATION STARTED")
     for i in range(number_of_tests):
+        test_data = _start_profile(data, profile)
         start = time.time()
-        best = opt.brute_force(data)
+        if vectorized:
+            best = opt.brute_force_vectorized(test_data)[0]
+        else:
+            best = opt.brute_force(test_data)
         end = time.time()
+        _stop_profile(test_data, profile_list)
         time_list.append((end-start)*1000)
         if best == 4556.63:
             success_list.append(1)
@@ -32,6 +121,8 @@ def bf_evaluation(data, number_of_tests):
     print("Average time: ", mean(time_list))
     print("Success rate in percent:", mean(success_list)*100)
 
+    profile_lines = _profile_summary(profile_list)
+
     # Create log file
     filename = "bf_tests_" + str(number_of_tests) + "_num_0.txt"
     path = Path(str("./logfiles_evaluation/" + filename))
@@ -48,16 +139,24 @@ def bf_evaluation(data, number_of_tests):
         file.write(str("Number of tests: " + str(number_of_tests) + "\n"))
         file.write(str("Average time in ms: " + str(mean(time_list)) + "\n"))
         file.write(str("Success rate in percent: " + str(mean(success_list)*100)))
+        for line in profile_lines:
+            file.write(str("\n" + line))
 
 
-def prs_evaluation(data, number_of_tests, number_of_evaluations):
+def prs_evaluation(data, number_of_tests, number_of_evaluations, vectorized=False, profile=False):
     time_list = []
     success_list = []
+    profile_list = []
     print("PURE RANDOM SEARCH EVALUATION STARTED")
     for i in range(number_of_tests):
+        test_data = _start_profile(data, profile)
         start = time.time()
-        best = opt.pure_random_search(data, number_of_evaluations)
+        if vectorized:
+            best = opt.pure_random_search_batched(test_data, number_of_evaluations)[0]
+        else:
+            best = opt.pure_random_search(test_data, number_of_evaluations)
         end = time.time()
+        _stop_profile(test_data, profile_list)
         time_list.append((end-start)*1000)
         if best == 4556.63:
             success_list.append(1)
@@ -71,6 +170,8 @@ def prs_evaluation(data, number_of_tests, number_of_evaluations):
     print("Average time: ", mean(time_list))
     print("Success rate in percent:", mean(success_list)*100)
 
+    profile_lines = _profile_summary(profile_list)
+
     # Create log file
     filename = "prs_tests_" + str(number_of_tests) + "_evaluations_" + str(number_of_evaluations) + "_num_0.txt"
     path = Path(str("./logfiles_evaluation/" + filename))
@@ -88,17 +189,27 @@ def prs_evaluation(data, number_of_tests, number_of_evaluations):
         file.write(str("Number of fitness evaluations: " + str(number_of_evaluations) + "\n \n"))
         file.write(str("Average time in ms: " + str(mean(time_list)) + "\n"))
         file.write(str("Success rate in percent: " + str(mean(success_list)*100)))
+        for line in profile_lines:
+            file.write(str("\n" + line))
 
 
-def hc_evaluation(data, number_of_tests, number_of_restarts):
+def hc_evaluation(data, number_of_tests, number_of_restarts, vectorized=False, basins=None, profile=False):
     time_list = []
     success_list = []
+    profile_list = []
     count_evaluations_list = []
     print("HILL CLIMBING EVALUATION STARTED")
     for i in range(number_of_tests):
+        test_data = _start_profile(data, profile)
         start = time.time()
-        [best, count] = opt.hill_climbing(data, number_of_restarts)
+        if basins is not None:
+            [best, count] = opt.hill_climbing_basin(test_data, number_of_restarts, basins)
+        elif vectorized:
+            [best, count] = opt.hill_climbing_vectorized(test_data, number_of_restarts)
+        else:
+            [best, count] = opt.hill_climbing(test_data, number_of_restarts)
         end = time.time()
+        _stop_profile(test_data, profile_list)
         time_list.append((end-start)*1000)
         count_evaluations_list.append(count)
         if best == 4556.63:
@@ -115,6 +226,8 @@ def hc_evaluation(data, number_of_tests, number_of_restarts):
     print("Count evaluation list: ", count_evaluations_list)
     print("Average number of fitness evaluations: ", mean(count_evaluations_list))
 
+    profile_lines = _profile_summary(profile_list)
+
     # Create log file
     filename = "hc_tests_" + str(number_of_tests) + "_restarts_" + str(number_of_restarts) + "_num_0.txt"
     path = Path(str("./logfiles_evaluation/" + filename))
@@ -133,17 +246,80 @@ def hc_evaluation(data, number_of_tests, number_of_restarts):
         file.write(str("Average time in ms: " + str(mean(time_list)) + "\n"))
         file.write(str("Success rate in percent: " + str(mean(success_list)*100) + "\n"))
         file.write(str("Number of fitness evaluations in total: " + str(mean(count_evaluations_list))))
+        for line in profile_lines:
+            file.write(str("\n" + line))
+
+
+def hc_basin_statistics(data, basins, number_of_restarts):
+    """
+    Computes the HC success rate and evaluation count from the basin index, without Monte Carlo runs.
+    Every start point (see dm.random_index_batch) is equally likely, so a single climb reaches the global maximum with
+    probability (size of its basin) / (number of start points).
+    :param data: data structure
+    :param basins: basin index of the data structure, see dm.load_basin_index
+    :param number_of_restarts: number of random restarts of one HC run
+    :return: [success rate in percent, average number of fitness evaluations, list of [altitude, basin size] of the
+              ten largest basins]
+    """
+    grid = dm.fitness_array(data)
+    flat = grid.ravel()
+    [x_index_max, y_index_max] = dm.random_index_range(data)
+    number_of_start_points = (x_index_max + 1) * (y_index_max + 1)
+
+    # Basin sizes (start points per local maximum), start points at altitude 0 do not climb
+    peak = basins["peak"].ravel()
+    climbing = peak >= 0
+    basin_size = np.bincount(peak[climbing], minlength=flat.size)
+
+    # Probability of a single climb ending at the global maximum, HC does restart + 1 climbs
+    highest_altitude = flat.max()
+    p_single = basin_size[flat == highest_altitude].sum() / number_of_start_points
+    success_rate = (1 - (1 - p_single) ** (number_of_restarts + 1)) * 100
+
+    # Expected evaluations: one per start point, four per step and four at the local maximum
+    evaluations = number_of_start_points + 4 * np.sum(basins["steps"].ravel()[climbing] + 1)
+    average_evaluations = evaluations / number_of_start_points * (number_of_restarts + 1)
+
+    # Largest basins
+    peaks = np.nonzero(basin_size)[0]
+    largest = peaks[np.argsort(-basin_size[peaks], kind="stable")[:10]]
+    largest_basins = [[float(flat[i]), int(basin_size[i])] for i in largest]
+
+    print("HC BASIN STATISTICS")
+    print("Number of local maxima: ", peaks.size)
+    print("Probability of a single climb reaching ", highest_altitude, ": ", p_single)
+    print("Success rate in percent for", number_of_restarts, "restarts:", success_rate)
+    print("Average number of fitness evaluations: ", average_evaluations)
+    print("Largest basins [altitude, size]: ", largest_basins)
+
+    return [success_rate, average_evaluations, largest_basins]
 
 
-def pso_evaluation(data, number_of_tests, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, plot_enable):
+def pso_evaluation(data, number_of_tests, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, plot_enable, vectorized=False, profile=False, number_of_islands=1, migration_interval=5, plot_path=None):
     time_list = []
     success_list = []
+    profile_list = []
     count_evaluations_list = []
+    count_unique_list = []
     print("PARTICLE SWARM OPTIMIZATION STARTED")
     for i in range(number_of_tests):
+        # Island model: lookups happen in the worker processes and are not profiled
+        test_data = _start_profile(data, profile and number_of_islands == 1)
+        # Swarm is only recorded during the test and plotted after the time is taken
+        frames = [] if plot_enable else False
         start = time.time()
-        result = opt.particle_swarm_optimization(data, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, plot_enable)
+        if number_of_islands > 1:
+            result = opt.particle_swarm_optimization_islands(test_data, number_of_islands, migration_interval, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements)
+            count_unique_list.append(result[2])
+        elif vectorized:
+            result = opt.particle_swarm_optimization_vectorized(test_data, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, frames)
+            count_unique_list.append(result[2])
+        else:
+            result = opt.particle_swarm_optimization(test_data, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, frames)
         end = time.time()
+        _stop_profile(test_data, profile_list)
+        if frames:
+            opt.plot_swarm_frames(frames, data, _numbered_path(plot_path, i))
         time_list.append((end-start)*1000)
         count_evaluations_list.append(result[1])
         if result[0] == 4556.63:
@@ -159,6 +335,10 @@ def pso_evaluation(data, number_of_tests, number_of_particles, time_steps, v_ine
     print("Success rate in percent:", mean(success_list)*100)
     print("Count evaluation list: ", count_evaluations_list)
     print("Average number of fitness evaluations: ", mean(count_evaluations_list))
+    if count_unique_list:
+        print("Average number of unique fitness evaluations: ", mean(count_unique_list))
+
+    profile_lines = _profile_summary(profile_list)
 
     # Create log file
     filename = "pso_tests_" + str(number_of_tests) + "_particles_" + str(number_of_particles) + "_num_0.txt"
@@ -182,8 +362,434 @@ def pso_evaluation(data, number_of_tests, number_of_particles, time_steps, v_ine
         file.write(str("v_swarm_center: " + str(v_swarm_center) + "\n"))
         file.write(str("hc_enable: " + str(enable_hc) + "\n"))
         file.write(str("hc_number_of_elements: " + str(number_of_hc_elements) + "\n"))
+        if number_of_islands > 1:
+            file.write(str("Number of islands: " + str(number_of_islands) + "\n"))
+            file.write(str("Migration interval: " + str(migration_interval) + "\n"))
+        file.write(str("Average time in ms: " + str(mean(time_list)) + "\n"))
+        file.write(str("Success rate in percent: " + str(mean(success_list)*100) + "\n"))
+        file.write(str("Number of fitness evaluations in total: " + str(mean(count_evaluations_list))))
+        if count_unique_list:
+            file.write(str("\nNumber of unique fitness evaluations in total: " + str(mean(count_unique_list))))
+        for line in profile_lines:
+            file.write(str("\n" + line))
+
+
+def mrs_evaluation(data, number_of_tests, start_level, beam_width, profile=False):
+    time_list = []
+    success_list = []
+    profile_list = []
+    count_evaluations_list = []
+    print("MULTI-RESOLUTION SEARCH EVALUATION STARTED")
+    pyramid = dm.load_max_pyramid(data)
+    # Building the pyramid reads every location once, not included in the counts of the tests
+    count_build = pyramid["values"][0].size
+    for i in range(number_of_tests):
+        test_data = _start_profile(data, profile)
+        start = time.time()
+        [best, count] = opt.multi_resolution_search(test_data, start_level, beam_width, pyramid=pyramid)
+        end = time.time()
+        _stop_profile(test_data, profile_list)
+        time_list.append((end-start)*1000)
+        count_evaluations_list.append(count)
+        if best == 4556.63:
+            success_list.append(1)
+        else:
+            success_list.append(0)
+        print("Best in test ", i, ": ", best)
+
+    print("MRS EVALUATION FINISHED")
+    print("Time list:", time_list)
+    print("Success list:", success_list)
+    print("Average time: ", mean(time_list))
+    print("Success rate in percent:", mean(success_list)*100)
+    print("Count evaluation list: ", count_evaluations_list)
+    print("Average number of fitness evaluations (without building the max pyramid): ", mean(count_evaluations_list))
+    print("Number of fitness evaluations to build the max pyramid (once per data structure): ", count_build)
+
+    profile_lines = _profile_summary(profile_list)
+
+    # Create log file
+    filename = "mrs_tests_" + str(number_of_tests) + "_level_" + str(start_level) + "_beam_" + str(beam_width) + "_num_0.txt"
+    path = Path(str("./logfiles_evaluation/" + filename))
+    number = 1
+    while path.is_file():
+        filename = "mrs_tests_" + str(number_of_tests) + "_level_" + str(start_level) + "_beam_" + str(beam_width) + "_num_" + str(number) + ".txt"
+        path = Path(str("./logfiles_evaluation/" + filename))
+        number += 1
+
+    # Log evaluated data
+    with open(str("./logfiles_evaluation/" + filename), "w") as file:
+        file.write("MRS Evaluation \n \n")
+        file.write(str("Date and Time: " + str(datetime.datetime.now()) + "\n \n"))
+        file.write(str("Number of tests: " + str(number_of_tests) + "\n"))
+        file.write(str("Start level: " + str(start_level) + "\n"))
+        file.write(str("Beam width: " + str(beam_width) + "\n \n"))
+        file.write(str("Average time in ms: " + str(mean(time_list)) + "\n"))
+        file.write(str("Success rate in percent: " + str(mean(success_list)*100) + "\n"))
+        file.write(str("Number of fitness evaluations in total (without building the max pyramid): " + str(mean(count_evaluations_list)) + "\n"))
+        file.write(str("Number of fitness evaluations to build the max pyramid (once per data structure): " + str(count_build)))
+        for line in profile_lines:
+            file.write(str("\n" + line))
+
+
+def sa_evaluation(data, number_of_tests, number_of_chains, steps, t_start, t_end, number_of_temperatures=1, swap_interval=10, profile=False):
+    time_list = []
+    success_list = []
+    profile_list = []
+    count_evaluations_list = []
+    print("SIMULATED ANNEALING EVALUATION STARTED")
+    for i in range(number_of_tests):
+        test_data = _start_profile(data, profile)
+        start = time.time()
+        [best, count] = opt.simulated_annealing(test_data, number_of_chains, steps, t_start, t_end, number_of_temperatures, swap_interval)
+        end = time.time()
+        _stop_profile(test_data, profile_list)
+        time_list.append((end-start)*1000)
+        count_evaluations_list.append(count)
+        if best == 4556.63:
+            success_list.append(1)
+        else:
+            success_list.append(0)
+        print("Best in test ", i, ": ", best)
+
+    print("SA EVALUATION FINISHED")
+    print("Time list:", time_list)
+    print("Success list:", success_list)
+    print("Average time: ", mean(time_list))
+    print("Success rate in percent:", mean(success_list)*100)
+    print("Count evaluation list: ", count_evaluations_list)
+    print("Average number of fitness evaluations: ", mean(count_evaluations_list))
+
+    profile_lines = _profile_summary(profile_list)
+
+    # Create log file
+    filename = "sa_tests_" + str(number_of_tests) + "_chains_" + str(number_of_chains) + "_num_0.txt"
+    path = Path(str("./logfiles_evaluation/" + filename))
+    number = 1
+    while path.is_file():
+        filename = "sa_tests_" + str(number_of_tests) + "_chains_" + str(number_of_chains) + "_num_" + str(number) + ".txt"
+        path = Path(str("./logfiles_evaluation/" + filename))
+        number += 1
+
+    # Log evaluated data
+    with open(str("./logfiles_evaluation/" + filename), "w") as file:
+        file.write("SA Evaluation \n \n")
+        file.write(str("Date and Time: " + str(datetime.datetime.now()) + "\n \n"))
+        file.write(str("Number of tests: " + str(number_of_tests) + "\n"))
+        file.write(str("Number of chains: " + str(number_of_chains) + "\n"))
+        file.write(str("Number of steps: " + str(steps) + "\n"))
+        file.write(str("Temperature (start / end): " + str(t_start) + " / " + str(t_end) + "\n"))
+        file.write(str("Number of temperatures: " + str(number_of_temperatures) + "\n"))
+        file.write(str("Swap interval: " + str(swap_interval) + "\n \n"))
+        file.write(str("Average time in ms: " + str(mean(time_list)) + "\n"))
+        file.write(str("Success rate in percent: " + str(mean(success_list)*100) + "\n"))
+        file.write(str("Number of fitness evaluations in total: " + str(mean(count_evaluations_list))))
+        for line in profile_lines:
+            file.write(str("\n" + line))
+
+
+def de_evaluation(data, number_of_tests, population_size, generations, weight, crossover, profile=False):
+    time_list = []
+    success_list = []
+    profile_list = []
+    count_evaluations_list = []
+    print("DIFFERENTIAL EVOLUTION EVALUATION STARTED")
+    for i in range(number_of_tests):
+        test_data = _start_profile(data, profile)
+        start = time.time()
+        [best, count] = opt.differential_evolution(test_data, population_size, generations, weight, crossover)
+        end = time.time()
+        _stop_profile(test_data, profile_list)
+        time_list.append((end-start)*1000)
+        count_evaluations_list.append(count)
+        if best == 4556.63:
+            success_list.append(1)
+        else:
+            success_list.append(0)
+        print("Best in test ", i, ": ", best)
+
+    print("DE EVALUATION FINISHED")
+    print("Time list:", time_list)
+    print("Success list:", success_list)
+    print("Average time: ", mean(time_list))
+    print("Success rate in percent:", mean(success_list)*100)
+    print("Count evaluation list: ", count_evaluations_list)
+    print("Average number of fitness evaluations: ", mean(count_evaluations_list))
+
+    profile_lines = _profile_summary(profile_list)
+
+    # Create log file
+    filename = "de_tests_" + str(number_of_tests) + "_population_" + str(population_size) + "_num_0.txt"
+    path = Path(str("./logfiles_evaluation/" + filename))
+    number = 1
+    while path.is_file():
+        filename = "de_tests_" + str(number_of_tests) + "_population_" + str(population_size) + "_num_" + str(number) + ".txt"
+        path = Path(str("./logfiles_evaluation/" + filename))
+        number += 1
+
+    # Log evaluated data
+    with open(str("./logfiles_evaluation/" + filename), "w") as file:
+        file.write("DE Evaluation \n \n")
+        file.write(str("Date and Time: " + str(datetime.datetime.now()) + "\n \n"))
+        file.write(str("Number of tests: " + str(number_of_tests) + "\n"))
+        file.write(str("Population size: " + str(population_size) + "\n \n"))
+        file.write(str("Number of generations: " + str(generations) + "\n"))
+        file.write(str("Differential weight: " + str(weight) + "\n"))
+        file.write(str("Crossover probability: " + str(crossover) + "\n"))
         file.write(str("Average time in ms: " + str(mean(time_list)) + "\n"))
         file.write(str("Success rate in percent: " + str(mean(success_list)*100) + "\n"))
         file.write(str("Number of fitness evaluations in total: " + str(mean(count_evaluations_list))))
+        for line in profile_lines:
+            file.write(str("\n" + line))
+
+
+# Max pyramid of the last data structure used by run_optimizer (multi-resolution search)
+_pyramid_cache = [None, None]
+
+
+def _max_pyramid(data):
+    """
+    Returns the max pyramid of the data structure, loaded only once per data structure (and worker process).
+    """
+    if _pyramid_cache[0] is not data:
+        _pyramid_cache[1] = dm.load_max_pyramid(data)
+        _pyramid_cache[0] = data
+    return _pyramid_cache[1]
+
+
+def run_optimizer(data, optimizer, parameters, seed=None, vectorized=True, budget=None):
+    """
+    Runs one optimizer once with the given parameters.
+    :param data: data structure
+    :param optimizer: "bf", "prs", "hc", "pso", "mrs", "sa" or "de"
+    :param parameters: dict with the parameters of the optimizer function (without data and seed), e.g.
+                       {"number_of_evaluations": 100000} for "prs", {"restart": 1000} for "hc" or
+                       {"start_level": 5, "beam_width": 4} for "mrs"
+    :param seed: seed of the run (vectorized engines: numpy generator, others: random module)
+    :param vectorized: use the vectorized engine of the optimizer
+    :param budget: optional opt.Budget. Only the non vectorized engines (and mrs, sa, de) support budgets, so they are used
+                   if given.
+    :return: [highest altitude found, number of fitness evaluations (None for bf; mrs: without building the max pyramid,
+              which is done once per data structure)]
+    """
+
+    if budget is not None:
+        vectorized = False
+    if not vectorized:
+        random.seed(seed)
+
+    if optimizer == "bf":
+        if vectorized:
+            return [opt.brute_force_vectorized(data)[0], None]
+        best = opt.brute_force(data, budget)
+        return [best, budget.evaluations if budget is not None else None]
+
+    elif optimizer == "prs":
+        if vectorized:
+            best = opt.pure_random_search_batched(data, seed=seed, **parameters)[0]
+        else:
+            best = opt.pure_random_search(data, budget=budget, **parameters)
+        return [best, budget.evaluations if budget is not None else parameters["number_of_evaluations"]]
+
+    elif optimizer == "hc":
+        if vectorized:
+            return opt.hill_climbing_vectorized(data, seed=seed, **parameters)
+        return opt.hill_climbing(data, budget=budget, **parameters)
+
+    elif optimizer == "pso":
+        if vectorized:
+            return opt.particle_swarm_optimization_vectorized(data, seed=seed, **parameters)[0:2]
+        return opt.particle_swarm_optimization(data, budget=budget, **parameters)
+
+    elif optimizer == "mrs":
+        return opt.multi_resolution_search(data, budget=budget, pyramid=_max_pyramid(data), **parameters)
+
+    elif optimizer == "sa":
+        return opt.simulated_annealing(data, seed=seed, budget=budget, **parameters)
+
+    elif optimizer == "de":
+        return opt.differential_evolution(data, seed=seed, budget=budget, **parameters)
+
+    raise ValueError("Unknown optimizer: " + str(optimizer))
+
+
+def _run_test(task):
+    """
+    Runs a single test in a worker process.
+    :param task: [optimizer, parameters, seed, vectorized]
+    :return: [time in ms, highest altitude found, number of fitness evaluations]
+    """
+    [optimizer, parameters, seed, vectorized] = task
+    start = time.time()
+    [best, count] = run_optimizer(dm.worker_grid(), optimizer, parameters, seed, vectorized)
+    end = time.time()
+    return [(end-start)*1000, best, count]
+
+
+def run_tests_parallel(tasks, number_of_workers=None):
+    """
+    Runs single optimizer tests in a process pool. Workers map the binary grid cache (dm.open_grid_memmap) instead of
+    receiving a pickled copy of the data structure.
+    :param tasks: list of [optimizer, parameters, seed, vectorized], see run_optimizer
+    :param number_of_workers: number of worker processes (None: number of CPUs)
+    :return: generator of [time in ms, highest altitude found, number of fitness evaluations], in order of tasks
+    """
+
+    # Make sure the cache (and the max pyramid for mrs) exists before the workers map it, so they do not build it at once
+    grid = dm.open_grid_memmap()
+    if any(task[0] == "mrs" for task in tasks):
+        dm.load_max_pyramid(grid)
+
+    context = dm.process_context()
+    if number_of_workers is None:
+        number_of_workers = context.cpu_count()
+    chunk_size = max(1, len(tasks) // (4 * number_of_workers))
+
+    with context.Pool(number_of_workers, dm.attach_worker_grid, (dm.FILE_PATH, dm.CACHE_PATH, dm.CACHE_STAMP_PATH)) as pool:
+        for result in pool.imap(_run_test, tasks, chunk_size):
+            yield result
+
+
+def parallel_evaluation(optimizer, number_of_tests, parameters, vectorized=True, number_of_workers=None, seed=None):
+    """
+    Same evaluation as bf/prs/hc/pso_evaluation, but the independent tests run in a process pool. Workers map the
+    binary grid cache (dm.open_grid_memmap) and every test gets its own seed, derived from seed.
+    :param optimizer: "bf", "prs", "hc", "pso", "mrs", "sa" or "de"
+    :param number_of_tests: number of repetitions
+    :param parameters: parameters of the optimizer, see run_optimizer
+    :param vectorized: use the vectorized engine of the optimizer
+    :param number_of_workers: number of worker processes (None: number of CPUs)
+    :param seed: seed from which the seeds of all tests are derived (None: fresh seed)
+    :return: [time list, success list, count evaluations list]
+    """
+
+    # Independent seeds for every test
+    seeds = np.random.SeedSequence(seed).generate_state(number_of_tests).tolist()
+    tasks = [[optimizer, parameters, test_seed, vectorized] for test_seed in seeds]
+
+    print("PARALLEL EVALUATION STARTED (" + optimizer.upper() + ")")
+    start = time.time()
+    results = list(run_tests_parallel(tasks, number_of_workers))
+    end = time.time()
+
+    # Merge results of all tests
+    time_list = [result[0] for result in results]
+    success_list = [1 if result[1] == 4556.63 else 0 for result in results]
+    count_evaluations_list = [result[2] for result in results if result[2] is not None]
+
+    print("PARALLEL EVALUATION FINISHED")
+    print("Time list:", time_list)
+    print("Success list:", success_list)
+    print("Average time: ", mean(time_list))
+    print("Success rate in percent:", mean(success_list)*100)
+    print("Wall time in ms: ", (end-start)*1000)
+    if count_evaluations_list:
+        print("Count evaluation list: ", count_evaluations_list)
+        print("Average number of fitness evaluations: ", mean(count_evaluations_list))
+
+    # Create log file
+    filename = optimizer + "_parallel_tests_" + str(number_of_tests) + "_num_0.txt"
+    path = Path(str("./logfiles_evaluation/" + filename))
+    number = 1
+    while path.is_file():
+        filename = optimizer + "_parallel_tests_" + str(number_of_tests) + "_num_" + str(number) + ".txt"
+        path = Path(str("./logfiles_evaluation/" + filename))
+        number += 1
+
+    # Log evaluated data
+    with open(str("./logfiles_evaluation/" + filename), "w") as file:
+        file.write(optimizer.upper() + " Parallel Evaluation \n \n")
+        file.write(str("Date and Time: " + str(datetime.datetime.now()) + "\n \n"))
+        file.write(str("Number of tests: " + str(number_of_tests) + "\n"))
+        file.write(str("Parameters: " + str(parameters) + "\n"))
+        file.write(str("Vectorized: " + str(vectorized) + "\n"))
+        file.write(str("Seed: " + str(seed) + "\n \n"))
+        file.write(str("Average time in ms: " + str(mean(time_list)) + "\n"))
+        file.write(str("Wall time in ms: " + str((end-start)*1000) + "\n"))
+        file.write(str("Success rate in percent: " + str(mean(success_list)*100)))
+        if count_evaluations_list:
+            file.write(str("\nNumber of fitness evaluations in total: " + str(mean(count_evaluations_list))))
+
+    return [time_list, success_list, count_evaluations_list]
+
+
+def budget_evaluation(data, optimizer, parameters, number_of_tests, max_evaluations=None, max_time=None):
+    """
+    Runs an optimizer with a fixed budget (number of fitness evaluations and/or time) and evaluates at which cost the
+    highest altitude (4556.63) was reached. Prints and logs a performance profile: share of tests which reached it
+    within a given number of evaluations.
+    Set the optimizer's own limit (e.g. number of restarts) high enough, so that the budget is what stops it.
+    :param data: data structure
+    :param optimizer: "bf", "prs", "hc", "pso", "mrs", "sa" or "de", see run_optimizer
+    :param parameters: parameters of the optimizer, see run_optimizer
+    :param number_of_tests: number of repetitions
+    :param max_evaluations: evaluation budget per test (None: no limit)
+    :param max_time: time budget per test in ms (None: no limit)
+    :return: list of best-so-far traces (see opt.Budget), one per test
+    """
+    time_list = []
+    success_list = []
+    evaluations_to_target_list = []
+    time_to_target_list = []
+    trace_list = []
+    print(optimizer.upper() + " BUDGET EVALUATION STARTED")
+    for i in range(number_of_tests):
+        budget = opt.Budget(max_evaluations, max_time)
+        start = time.time()
+        [best, count] = run_optimizer(data, optimizer, parameters, budget=budget)
+        end = time.time()
+        time_list.append((end-start)*1000)
+        trace_list.append(budget.trace)
+
+        # First point of the trace at the highest altitude
+        reached = [point for point in budget.trace if point[2] == 4556.63]
+        if reached:
+            success_list.append(1)
+            evaluations_to_target_list.append(reached[0][0])
+            time_to_target_list.append(reached[0][1])
+        else:
+            success_list.append(0)
+        print("Best in test ", i, ": ", best, " (evaluations: ", budget.evaluations, ")")
+
+    # Performance profile: share of tests which reached the highest altitude within a number of evaluations
+    largest = max_evaluations if max_evaluations is not None else max([1] + evaluations_to_target_list)
+    checkpoints = sorted(set(int(round(largest * 2 ** -k)) for k in range(10)))
+    profile = []
+    for checkpoint in checkpoints:
+        share = sum(1 for evaluations in evaluations_to_target_list if evaluations <= checkpoint) / number_of_tests
+        profile.append([checkpoint, share * 100])
+
+    print(optimizer.upper() + " BUDGET EVALUATION FINISHED")
+    print("Average time: ", mean(time_list))
+    print("Success rate in percent:", mean(success_list)*100)
+    if evaluations_to_target_list:
+        print("Average number of fitness evaluations to reach 4556.63: ", mean(evaluations_to_target_list))
+        print("Average time to reach 4556.63 in ms: ", mean(time_to_target_list))
+    print("Performance profile [evaluations, success rate in percent]: ", profile)
+
+    # Create log file
+    filename = optimizer + "_budget_tests_" + str(number_of_tests) + "_evaluations_" + str(max_evaluations) + "_time_" + str(max_time) + "_num_0.txt"
+    path = Path(str("./logfiles_evaluation/" + filename))
+    number = 1
+    while path.is_file():
+        filename = optimizer + "_budget_tests_" + str(number_of_tests) + "_evaluations_" + str(max_evaluations) + "_time_" + str(max_time) + "_num_" + str(number) + ".txt"
+        path = Path(str("./logfiles_evaluation/" + filename))
+        number += 1
+
+    # Log evaluated data
+    with open(str("./logfiles_evaluation/" + filename), "w") as file:
+        file.write(optimizer.upper() + " Budget Evaluation \n \n")
+        file.write(str("Date and Time: " + str(datetime.datetime.now()) + "\n \n"))
+        file.write(str("Number of tests: " + str(number_of_tests) + "\n"))
+        file.write(str("Parameters: " + str(parameters) + "\n"))
+        file.write(str("Evaluation budget: " + str(max_evaluations) + "\n"))
+        file.write(str("Time budget in ms: " + str(max_time) + "\n \n"))
+        file.write(str("Average time in ms: " + str(mean(time_list)) + "\n"))
+        file.write(str("Success rate in percent: " + str(mean(success_list)*100) + "\n"))
+        if evaluations_to_target_list:
+            file.write(str("Average number of fitness evaluations to reach 4556.63: " + str(mean(evaluations_to_target_list)) + "\n"))
+            file.write(str("Average time to reach 4556.63 in ms: " + str(mean(time_to_target_list)) + "\n"))
+        file.write(str("Performance profile [evaluations, success rate in percent]: " + str(profile)))
 
+    return trace_list
 
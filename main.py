@@ -6,29 +6,62 @@
     Evaluation mode: If set to true, respective functions of the evaluation module are called.
                      Repeats the optimizer test for a specified number and returns avg. time and avg. success rate
                      Result is logged in folder logfiles_evaluation
+
+    Scheduler mode: If set to true, the jobs of JOBS (mixed optimizers) run concurrently with live progress output.
 """
 
 import time
+import asyncio
 import data_methods as dm
 import optimizers as opt
 import evaluation as eval
+import query_server
+import scheduler
 
 # Enable/Disable optimizers for testing
 BF = True  # Brute Force
 PRS = False  # Pure Random Search
 HC = False  # Hill Climbing
 PSO = False  # Particle Swarm Optimization
+MRS = False  # Multi-Resolution Search (coarse-to-fine over the max pyramid)
+SA = False  # Simulated Annealing (parallel tempering if SA_NUMBER_OF_TEMPERATURES > 1)
+DE = False  # Differential Evolution
 TEST_COORDS = False  # Can be used for evaluation of a height given by x,y-user input
+TEST_REGION = False  # Can be used for the highest point in a rectangle given by x1,y1,x2,y2-user input (max pyramid)
+SERVE = False  # If enabled, the loaded data set answers queries of other processes (see query_server.py, query_client.py)
+COMPARE_LOAD_TIMES = False  # Prints time needed to load the data set with (warm) and without (cold) binary cache
+PARSE_WORKERS = 1  # Number of processes parsing the .xyz file when the binary cache or the tiles are built (None: number of CPUs)
+VECTORIZED = True  # If enabled, the vectorized (numpy) engine of the selected optimizer is used where available
+SEED = None  # Seed for the vectorized engines (None: fresh seed for every run)
+MEMORY_MAPPED = False  # If enabled, the data set is memory-mapped from the binary cache instead of loaded into RAM
+TILED = False  # If enabled, the data set is loaded tile by tile on demand (large DEMs, not for PARALLEL)
+TILE_CACHE_SIZE = 64  # Maximum number of tiles kept in memory
+QUANTIZED = False  # If enabled, the altitudes are stored as integer cm (half the memory of the float grid, exact)
+QUANTIZED_MASK = False  # If enabled, the quantized grid also keeps the mask of locations with an altitude
+PROFILE = False  # If enabled, fitness lookups are counted and the time per phase (lookup, rng, ...) is printed
+MEMOIZE = False  # If enabled, fitness values are memoized (LRU) and memo hits / misses are printed (not for PARALLEL)
+MEMO_SIZE = 65536  # Maximum number of memoized fitness values
 
 # Enable/Disable evaluation mode (description in introduction above)
 EVALUATION = False
 NUMBER_OF_TESTS = 5
+PARALLEL = False  # If enabled, the tests of the evaluation mode run in a process pool
+NUMBER_OF_WORKERS = None  # Number of worker processes (None: number of CPUs)
+
+# Budget: if any limit is set, the optimizer stops when it is used up and returns the best result found so far.
+# Budgets are supported by the non vectorized engines, which are used then. Evaluation mode: budget_evaluation
+MAX_EVALUATIONS = None  # Maximum number of fitness evaluations per run
+MAX_TIME = None  # Maximum time per run in ms
+
+# BF constants
+BF_REGION = None  # If set to [x1, y1, x2, y2], BF returns the highest point in this rectangle (max pyramid)
 
 # PRS constants
 NUMBER_OF_EVALUATIONS = 100000
 
 # HC constants
 NUMBER_OF_RESTARTS = 1000
+HC_BASIN_INDEX = False  # If enabled, HC results are looked up in the precomputed basin index instead of climbing
 
 # PSO constants
 NUMBER_OF_PARTICLES = 100  # How many particles are initialized
@@ -39,12 +72,72 @@ V_BEST_LOCAL = 0  # Velocity towards position of local max. fitness in steps
 V_SWARM_CENTER = 0   # Velocity towards swarm center in steps
 ENABLE_HC = True  # If enabled, a specified amount of particles does hill climbing (HC) if among the best ones (T/F)
 NUMBER_OF_HC_ELEMENTS = 30  # Number of particles doing HC (number of best ones, eg best, second-best, etc.)
-PLOT = False  # If enabled, particles are plotted for each time step
+PLOT = False  # If enabled, particles are recorded for each time step and plotted after the run (not timed)
+PLOT_PATH = None  # If set (e.g. "./logfiles_evaluation/pso_swarm.gif"), the plots are written to an animation file
+NUMBER_OF_ISLANDS = 1  # If > 1, island model: this many swarms run in worker processes (no plotting, no budget)
+MIGRATION_INTERVAL = 5  # Island model: the best particle of every swarm migrates to the next one every N time steps
+PSO_PARAMETERS = {"number_of_particles": NUMBER_OF_PARTICLES, "time_steps": TIME_STEPS, "v_inertia": V_INERTIA,
+                  "v_best_global": V_BEST_GLOBAL, "v_best_local": V_BEST_LOCAL, "v_swarm_center": V_SWARM_CENTER,
+                  "enable_hc": ENABLE_HC, "number_of_hc_elements": NUMBER_OF_HC_ELEMENTS, "plot_enable": PLOT}
+
+# MRS constants
+MRS_START_LEVEL = 5  # Cells of 2^5 x 2^5 grid points (6.4 km)
+MRS_BEAM_WIDTH = 4  # Number of cells refined per level
+MRS_PARAMETERS = {"start_level": MRS_START_LEVEL, "beam_width": MRS_BEAM_WIDTH}
+
+# SA constants
+SA_NUMBER_OF_CHAINS = 100  # Number of chains (parallel tempering: groups of chains, one chain per temperature)
+SA_STEPS = 300  # Number of steps of every chain
+SA_T_START = 500  # Start temperature in m (parallel tempering: hottest)
+SA_T_END = 5  # End temperature in m (parallel tempering: coldest)
+SA_NUMBER_OF_TEMPERATURES = 10  # 1: annealing, > 1: parallel tempering with this many temperatures
+SA_SWAP_INTERVAL = 5  # Parallel tempering: number of steps between two swaps of neighbouring temperatures
+SA_PARAMETERS = {"number_of_chains": SA_NUMBER_OF_CHAINS, "steps": SA_STEPS, "t_start": SA_T_START, "t_end": SA_T_END,
+                 "number_of_temperatures": SA_NUMBER_OF_TEMPERATURES, "swap_interval": SA_SWAP_INTERVAL}
+
+# DE constants
+DE_POPULATION_SIZE = 200  # Number of individuals
+DE_GENERATIONS = 100  # Number of generations
+DE_WEIGHT = 0.8  # Differential weight
+DE_CROSSOVER = 0.9  # Crossover probability
+DE_PARAMETERS = {"population_size": DE_POPULATION_SIZE, "generations": DE_GENERATIONS, "weight": DE_WEIGHT,
+                 "crossover": DE_CROSSOVER}
+
+# Scheduler: if enabled, the jobs below run concurrently in a process pool and their progress is printed while they run
+# (see scheduler.py). Every job: optimizer, parameters and optionally seed, max_evaluations and max_time (in ms)
+SCHEDULE = False
+JOBS = [{"optimizer": "prs", "parameters": {"number_of_evaluations": NUMBER_OF_EVALUATIONS}, "max_time": 2000},
+        {"optimizer": "hc", "parameters": {"restart": NUMBER_OF_RESTARTS}, "max_time": 2000},
+        {"optimizer": "pso", "parameters": dict(PSO_PARAMETERS, plot_enable=False), "max_time": 2000}]
+MAX_CONCURRENT_JOBS = None  # Maximum number of jobs running at once (None: number of CPUs)
+CANCEL_MARGIN = None  # If set, a job is cancelled when its best is more than this many m below the best of all jobs
+CANCEL_AFTER = 1000  # Minimum running time of a job in ms before it can be cancelled
 
 # Initialize data set
 print("START COLLECTING DATA")
-data = dm.generate_data_structure()
+if COMPARE_LOAD_TIMES:
+    [cold, warm] = dm.measure_load_times(number_of_workers=PARSE_WORKERS)
+    print("Load time in ms (cold / warm): ", cold, " / ", warm)
+start = time.time()
+if TILED:
+    data = dm.open_tiled_grid(max_tiles=TILE_CACHE_SIZE, number_of_workers=PARSE_WORKERS)
+elif QUANTIZED:
+    data = dm.load_quantized_grid(with_mask=QUANTIZED_MASK)
+elif MEMORY_MAPPED:
+    data = dm.open_grid_memmap(number_of_workers=PARSE_WORKERS)
+else:
+    data = dm.load_grid(number_of_workers=PARSE_WORKERS)
+end = time.time()
 print("DATA COLLECTED")
+print("Time required in ms: ", (end - start)*1000)
+
+# Memo in front of the data structure, used by all optimizers through dm.get_fitness / dm.get_fitness_batch
+if MEMOIZE:
+    data = dm.MemoizedFitness(data, MEMO_SIZE)
+
+# Query server: elevations, top k locations of a region and optimizer runs for other processes
+if SERVE:
+    query_server.serve(data)
 
 # Test Coords
 if TEST_COORDS:
@@ -53,47 +146,153 @@ if TEST_COORDS:
     while True:
         x = int(input())
         y = int(input())
-        index = dm.coords_to_index(x, y)
+        index = dm.coords_to_index(x, y, data)
         print(dm.get_fitness(data, index[0], index[1]))
 
-if EVALUATION:
+# Test Region
+if TEST_REGION:
+    print("TEST REGION MODE")
+    pyramid = dm.load_max_pyramid(data)
+    print("Specify x1, y1, x2 and y2 coordinate below")
+    while True:
+        x1 = int(input())
+        y1 = int(input())
+        x2 = int(input())
+        y2 = int(input())
+        print(dm.region_max_coords(pyramid, x1, y1, x2, y2, data))
+
+if SCHEDULE:
+    print("SCHEDULER STARTED")
+    start = time.time()
+    results = asyncio.run(scheduler.run_jobs(JOBS, MAX_CONCURRENT_JOBS, scheduler.print_event, CANCEL_MARGIN, CANCEL_AFTER))
+    end = time.time()
+    print("SCHEDULER FINISHED")
+    for job, result in zip(JOBS, results):
+        print(job["optimizer"].upper(), "highest altitude / evaluations / time in ms / cancelled: ", result)
+    print("Wall time in ms: ", (end - start)*1000)
+
+elif EVALUATION and (MAX_EVALUATIONS is not None or MAX_TIME is not None):
+    if BF:
+        eval.budget_evaluation(data, "bf", {}, NUMBER_OF_TESTS, MAX_EVALUATIONS, MAX_TIME)
+    elif PRS:
+        eval.budget_evaluation(data, "prs", {"number_of_evaluations": NUMBER_OF_EVALUATIONS}, NUMBER_OF_TESTS, MAX_EVALUATIONS, MAX_TIME)
+    elif HC:
+        eval.budget_evaluation(data, "hc", {"restart": NUMBER_OF_RESTARTS}, NUMBER_OF_TESTS, MAX_EVALUATIONS, MAX_TIME)
+    elif PSO:
+        eval.budget_evaluation(data, "pso", dict(PSO_PARAMETERS, plot_enable=False), NUMBER_OF_TESTS, MAX_EVALUATIONS, MAX_TIME)
+    elif MRS:
+        eval.budget_evaluation(data, "mrs", MRS_PARAMETERS, NUMBER_OF_TESTS, MAX_EVALUATIONS, MAX_TIME)
+    elif SA:
+        eval.budget_evaluation(data, "sa", SA_PARAMETERS, NUMBER_OF_TESTS, MAX_EVALUATIONS, MAX_TIME)
+    elif DE:
+        eval.budget_evaluation(data, "de", DE_PARAMETERS, NUMBER_OF_TESTS, MAX_EVALUATIONS, MAX_TIME)
+    else:
+        print("ERROR: Evaluation started but no optimizer selected in main.py")
+
+elif EVALUATION and PARALLEL:
+    if BF:
+        eval.parallel_evaluation("bf", NUMBER_OF_TESTS, {}, VECTORIZED, NUMBER_OF_WORKERS, SEED)
+    elif PRS:
+        eval.parallel_evaluation("prs", NUMBER_OF_TESTS, {"number_of_evaluations": NUMBER_OF_EVALUATIONS}, VECTORIZED, NUMBER_OF_WORKERS, SEED)
+    elif HC:
+        eval.parallel_evaluation("hc", NUMBER_OF_TESTS, {"restart": NUMBER_OF_RESTARTS}, VECTORIZED, NUMBER_OF_WORKERS, SEED)
+    elif PSO:
+        eval.parallel_evaluation("pso", NUMBER_OF_TESTS, dict(PSO_PARAMETERS, plot_enable=False), VECTORIZED, NUMBER_OF_WORKERS, SEED)
+    elif MRS:
+        eval.parallel_evaluation("mrs", NUMBER_OF_TESTS, MRS_PARAMETERS, VECTORIZED, NUMBER_OF_WORKERS, SEED)
+    elif SA:
+        eval.parallel_evaluation("sa", NUMBER_OF_TESTS, SA_PARAMETERS, VECTORIZED, NUMBER_OF_WORKERS, SEED)
+    elif DE:
+        eval.parallel_evaluation("de", NUMBER_OF_TESTS, DE_PARAMETERS, VECTORIZED, NUMBER_OF_WORKERS, SEED)
+    else:
+        print("ERROR: Evaluation started but no optimizer selected in main.py")
+
+elif EVALUATION:
     if BF:
-        eval.bf_evaluation(data, NUMBER_OF_TESTS)
+        eval.bf_evaluation(data, NUMBER_OF_TESTS, VECTORIZED, PROFILE)
     elif PRS:
-        eval.prs_evaluation(data, NUMBER_OF_TESTS, NUMBER_OF_EVALUATIONS)
+        eval.prs_evaluation(data, NUMBER_OF_TESTS, NUMBER_OF_EVALUATIONS, VECTORIZED, PROFILE)
     elif HC:
-        eval.hc_evaluation(data, NUMBER_OF_TESTS, NUMBER_OF_RESTARTS)
+        if HC_BASIN_INDEX:
+            basins = dm.load_basin_index(data)
+            eval.hc_basin_statistics(data, basins, NUMBER_OF_RESTARTS)
+            eval.hc_evaluation(data, NUMBER_OF_TESTS, NUMBER_OF_RESTARTS, VECTORIZED, basins, PROFILE)
+        else:
+            eval.hc_evaluation(data, NUMBER_OF_TESTS, NUMBER_OF_RESTARTS, VECTORIZED, None, PROFILE)
     elif PSO:
-        eval.pso_evaluation(data, NUMBER_OF_TESTS, NUMBER_OF_PARTICLES, TIME_STEPS, V_INERTIA, V_BEST_GLOBAL, V_BEST_LOCAL, V_SWARM_CENTER, ENABLE_HC, NUMBER_OF_HC_ELEMENTS, PLOT)
+        eval.pso_evaluation(data, NUMBER_OF_TESTS, NUMBER_OF_PARTICLES, TIME_STEPS, V_INERTIA, V_BEST_GLOBAL, V_BEST_LOCAL, V_SWARM_CENTER, ENABLE_HC, NUMBER_OF_HC_ELEMENTS, PLOT, VECTORIZED, PROFILE, NUMBER_OF_ISLANDS, MIGRATION_INTERVAL, PLOT_PATH)
+    elif MRS:
+        eval.mrs_evaluation(data, NUMBER_OF_TESTS, MRS_START_LEVEL, MRS_BEAM_WIDTH, PROFILE)
+    elif SA:
+        eval.sa_evaluation(data, NUMBER_OF_TESTS, SA_NUMBER_OF_CHAINS, SA_STEPS, SA_T_START, SA_T_END, SA_NUMBER_OF_TEMPERATURES, SA_SWAP_INTERVAL, PROFILE)
+    elif DE:
+        eval.de_evaluation(data, NUMBER_OF_TESTS, DE_POPULATION_SIZE, DE_GENERATIONS, DE_WEIGHT, DE_CROSSOVER, PROFILE)
     else:
         print("ERROR: Evaluation started but no optimizer selected in main.py")
 
 else:
+    # Budget for a single run (non vectorized engines only)
+    budget = None
+    if MAX_EVALUATIONS is not None or MAX_TIME is not None:
+        budget = opt.Budget(MAX_EVALUATIONS, MAX_TIME)
+        VECTORIZED = False
+
+    # Swarm frames of a PSO run, plotted at the end
+    frames = False
+
+    # Max pyramid (BF region, MRS), loaded before the run
+    if (BF and BF_REGION is not None) or MRS:
+        pyramid = dm.load_max_pyramid(data)
+
+    # Instrumented data structure (counts lookups, times the phases of the run)
+    if PROFILE:
+        data = dm.FitnessOracle(data, True)
+        data.start()
+
     # Brute Force
     if BF:
         print("BRUTE FORCE STARTED")
         start = time.time()
-        best = opt.brute_force(data)
+        if BF_REGION is not None:
+            [best, x, y] = opt.brute_force_region(data, *BF_REGION, pyramid)
+        elif VECTORIZED:
+            [best, x, y] = opt.brute_force_vectorized(data)
+        else:
+            best = opt.brute_force(data, budget)
         end = time.time()
         print("BF FINISHED")
         print("Highest Altitude: ", best)
+        if VECTORIZED or BF_REGION is not None:
+            print("Location (x, y): ", x, y)
         print("Time required in ms: ", (end - start)*1000)
 
     # Pure Random Search
     elif PRS:
         print("PURE RANDOM SEARCH STARTED")
         start = time.time()
-        best = opt.pure_random_search(data, NUMBER_OF_EVALUATIONS)
+        if VECTORIZED:
+            [best, x, y] = opt.pure_random_search_batched(data, NUMBER_OF_EVALUATIONS, SEED)
+        else:
+            best = opt.pure_random_search(data, NUMBER_OF_EVALUATIONS, budget)
         end = time.time()
         print("PRS FINISHED")
         print("Highest Altitude: ", best)
+        if VECTORIZED:
+            print("Location (x, y): ", x, y)
         print("Time required in ms: ", (end - start)*1000)
 
     # Hill Climbing
     elif HC:
         print("HILL CLIMBING STARTED")
+        if HC_BASIN_INDEX and budget is None:
+            basins = dm.load_basin_index(data)
         start = time.time()
-        result = opt.hill_climbing(data, NUMBER_OF_RESTARTS)
+        if HC_BASIN_INDEX and budget is None:
+            result = opt.hill_climbing_basin(data, NUMBER_OF_RESTARTS, basins, SEED)
+        elif VECTORIZED:
+            result = opt.hill_climbing_vectorized(data, NUMBER_OF_RESTARTS, SEED)
+        else:
+            result = opt.hill_climbing(data, NUMBER_OF_RESTARTS, budget)
         end = time.time()
         print("HC FINISHED")
         print("Highest Altitude: ", result[0])
@@ -103,13 +302,79 @@ else:
     # Particle Swarm Optimization
     elif PSO:
         print("PARTICLE SWARM OPTIMIZATION STARTED")
+        if PLOT:
+            frames = []
         start = time.time()
-        result = opt.particle_swarm_optimization(data, NUMBER_OF_PARTICLES, TIME_STEPS, V_INERTIA, V_BEST_GLOBAL, V_BEST_LOCAL, V_SWARM_CENTER, ENABLE_HC, NUMBER_OF_HC_ELEMENTS, PLOT)
+        if NUMBER_OF_ISLANDS > 1 and budget is None:
+            result = opt.particle_swarm_optimization_islands(data, NUMBER_OF_ISLANDS, MIGRATION_INTERVAL, NUMBER_OF_PARTICLES, TIME_STEPS, V_INERTIA, V_BEST_GLOBAL, V_BEST_LOCAL, V_SWARM_CENTER, ENABLE_HC, NUMBER_OF_HC_ELEMENTS, SEED)
+        elif VECTORIZED:
+            result = opt.particle_swarm_optimization_vectorized(data, NUMBER_OF_PARTICLES, TIME_STEPS, V_INERTIA, V_BEST_GLOBAL, V_BEST_LOCAL, V_SWARM_CENTER, ENABLE_HC, NUMBER_OF_HC_ELEMENTS, frames, SEED)
+        else:
+            result = opt.particle_swarm_optimization(data, NUMBER_OF_PARTICLES, TIME_STEPS, V_INERTIA, V_BEST_GLOBAL, V_BEST_LOCAL, V_SWARM_CENTER, ENABLE_HC, NUMBER_OF_HC_ELEMENTS, frames, budget)
         end = time.time()
         print("PSO FINISHED")
         print("Highest Altitude: ", result[0])
         print("Number of fitness evaluations: ", result[1])
+        if len(result) > 2:
+            print("Number of unique fitness evaluations: ", result[2])
+        print("Time required in ms: ", (end - start)*1000)
+
+    # Multi-Resolution Search
+    elif MRS:
+        print("MULTI-RESOLUTION SEARCH STARTED")
+        start = time.time()
+        result = opt.multi_resolution_search(data, MRS_START_LEVEL, MRS_BEAM_WIDTH, budget, pyramid)
+        end = time.time()
+        print("MRS FINISHED")
+        print("Highest Altitude: ", result[0])
+        print("Number of fitness evaluations (without building the max pyramid): ", result[1])
+        print("Number of fitness evaluations to build the max pyramid (once per data structure): ", pyramid["values"][0].size)
+        print("Time required in ms: ", (end - start)*1000)
+
+    # Simulated Annealing
+    elif SA:
+        print("SIMULATED ANNEALING STARTED")
+        start = time.time()
+        result = opt.simulated_annealing(data, SA_NUMBER_OF_CHAINS, SA_STEPS, SA_T_START, SA_T_END, SA_NUMBER_OF_TEMPERATURES, SA_SWAP_INTERVAL, SEED, budget)
+        end = time.time()
+        print("SA FINISHED")
+        print("Highest Altitude: ", result[0])
+        print("Number of fitness evaluations: ", result[1])
+        print("Time required in ms: ", (end - start)*1000)
+
+    # Differential Evolution
+    elif DE:
+        print("DIFFERENTIAL EVOLUTION STARTED")
+        start = time.time()
+        result = opt.differential_evolution(data, DE_POPULATION_SIZE, DE_GENERATIONS, DE_WEIGHT, DE_CROSSOVER, SEED, budget)
+        end = time.time()
+        print("DE FINISHED")
+        print("Highest Altitude: ", result[0])
+        print("Number of fitness evaluations: ", result[1])
         print("Time required in ms: ", (end - start)*1000)
 
     else:
         print("ERROR: No optimizer selected in main.py")
+
+    # Lookup counts and time per phase
+    if PROFILE:
+        data.stop()
+        report = data.report()
+        print("Number of fitness lookups (total / unique / out of bounds): ", report["lookups"], " / ", report["unique"], " / ", report["out_of_bounds"])
+        for phase in ["lookup", "rng", "bookkeeping", "plotting"]:
+            print("Time " + phase + " in ms: ", report["phases_ms"][phase])
+
+    # Raw lookups and lookups which reached the data structure behind the memo
+    if MEMOIZE:
+        memo = data.data if PROFILE else data
+        report = memo.report()
+        print("Number of fitness evaluations (raw / reaching the data structure): ", report["lookups"], " / ", report["misses"])
+        print("Memo hits / evictions: ", report["hits"], " / ", report["evictions"])
+
+    # Best-so-far trace of the budget
+    if budget is not None:
+        print("Number of fitness evaluations (budget): ", budget.evaluations)
+        print("Best-so-far trace [evaluations, time in ms, altitude]: ", budget.trace)
+
+    # Swarm plots, after the profile clock is stopped so that plotting is not part of the profiled run
+    opt.plot_swarm_frames(frames, data, PLOT_PATH)
@@ -1,29 +1,131 @@
 """
-    This module implements four different optimizer:
+    This module implements seven different optimizer:
      - Brute Force
      - Pure Random Search
      - Hill Climbing
      - Particle Swarm Optimization
+     - Multi-Resolution Search (coarse-to-fine over the max pyramid, see dm.build_max_pyramid)
+     - Simulated Annealing (many chains at once, optionally as parallel tempering)
+     - Differential Evolution (on the 200 m grid, one batch lookup per generation)
+
+    All seven accept a Budget (fixed number of fitness evaluations and/or deadline) and then return the best result
+    found when the budget is used up, with a best-so-far trace in the budget.
+
+    Vectorized engines (numpy, much faster):
+     - brute_force_vectorized
+     - brute_force_region (highest altitude in a rectangle, looked up in the max pyramid, see dm.build_max_pyramid,
+                           or the top k locations of the rectangle)
+     - pure_random_search_batched
+     - hill_climbing_vectorized
+     - hill_climbing_basin (answers looked up in the precomputed basin index, see dm.build_basin_index)
+     - particle_swarm_optimization_vectorized
+     - particle_swarm_optimization_islands (island model: several swarms in worker processes, with migration)
+
+    Plotting (matplotlib is imported only when something is plotted): PSO records the swarm at every time step into a
+    frame buffer, plot_swarm_frames shows or animates the frames after the (timed) run.
 """
 
 import time
+import numpy as np
 import data_methods as dm
 
 from statistics import mean
 from statistics import stdev
-import matplotlib.pyplot as plt
 
 
-def brute_force(data):
+class Budget:
+    """
+    Evaluation and wall-clock budget of a single optimizer run (use a new Budget for every run).
+    The optimizer reports its fitness evaluations with update() and stops as soon as exhausted() is True.
+    Evaluations are reported in small groups (a hill climbing step, a PSO particle, the PSO update at the end of a
+    time step), so the evaluation budget can be exceeded by one such group.
+    trace: best-so-far trace, one entry [number of evaluations, time in ms, best fitness] per improvement
+    A callback gets the progress of the run while it is running; stop() ends the run early (e.g. from the callback).
+    """
+
+    def __init__(self, max_evaluations=None, max_time=None, callback=None, callback_interval=100):
+        """
+        :param max_evaluations: maximum number of fitness evaluations (None: no limit)
+        :param max_time: maximum time in ms, measured from start() (None: no limit)
+        :param callback: optional function callback(budget), called from update() at most every callback_interval ms
+        :param callback_interval: minimum time between two callbacks in ms
+        """
+        self.max_evaluations = max_evaluations
+        self.max_time = max_time
+        self.callback = callback
+        self.callback_interval = callback_interval
+        self.evaluations = 0
+        self.best = 0
+        self.trace = []
+        self.start_time = None
+        self.callback_time = 0
+        self.stopped = False
+
+    def start(self):
+        """
+        Starts the clock, called by the optimizer. Only the first call counts.
+        """
+        if self.start_time is None:
+            self.start_time = time.time()
+
+    def elapsed(self):
+        """
+        :return: time since start() in ms
+        """
+        return (time.time() - self.start_time) * 1000
+
+    def update(self, evaluations, fitness):
+        """
+        Counts fitness evaluations and records the best-so-far trace.
+        :param evaluations: number of fitness evaluations done
+        :param fitness: best fitness among these evaluations
+        :return: True if the budget is used up
+        """
+        self.evaluations += evaluations
+        if fitness > self.best:
+            self.best = fitness
+            self.trace.append([self.evaluations, self.elapsed(), fitness])
+
+        # Progress of the run
+        if self.callback is not None:
+            elapsed = self.elapsed()
+            if elapsed - self.callback_time >= self.callback_interval:
+                self.callback_time = elapsed
+                self.callback(self)
+
+        return self.exhausted()
+
+    def stop(self):
+        """
+        Ends the run: exhausted() is True from now on.
+        """
+        self.stopped = True
+
+    def exhausted(self):
+        """
+        :return: True if the number of evaluations or the time is used up, or the run was stopped
+        """
+        if self.stopped:
+            return True
+        if self.max_evaluations is not None and self.evaluations >= self.max_evaluations:
+            return True
+        if self.max_time is not None and self.elapsed() >= self.max_time:
+            return True
+        return False
+
+
+def brute_force(data, budget=None):
     """
     Evaluates fitness (altitude) for every location represented in the data structure
     :param data: data structure
+    :param budget: optional Budget, stops when it is used up
     :return: highest altitude
     """
     # Initialize vars
     highest_altitude = 0
-    len_y = len(data)
-    len_x = len(data[0])
+    [len_y, len_x] = dm.data_shape(data)
+    if budget is not None:
+        budget.start()
 
     # Loop through data structure
     for x in range(0, len_x):
@@ -33,47 +135,176 @@ def brute_force(data):
             if fitness > highest_altitude:
                 highest_altitude = fitness
 
+            # Stop if budget is used up
+            if budget is not None and budget.update(1, fitness):
+                return highest_altitude
+
     return highest_altitude
 
 
-def pure_random_search(data, number_of_evaluations):
+def brute_force_vectorized(data, top_k=None):
+    """
+    Brute Force in one vectorized pass over the whole data structure. Also returns where the highest altitude is.
+    :param data: data structure
+    :param top_k: if given, the top_k highest locations are returned instead of only the highest one
+    :return: [highest altitude, x, y] in Swiss coordinates, or a list of top_k such entries (highest first)
+    """
+
+    grid = dm.fitness_array(data)
+    width = grid.shape[1]
+
+    # Highest location only
+    if top_k is None:
+        flat_index = int(np.argmax(grid))
+        y_index, x_index = divmod(flat_index, width)
+        [x, y] = dm.index_to_coords(x_index, y_index, data)
+        return [float(grid[y_index, x_index]), x, y]
+
+    # Top k locations, sorted by altitude (highest first)
+    flat = grid.ravel()
+    top_k = min(top_k, flat.size)
+    flat_indexes = np.argpartition(flat, flat.size - top_k)[flat.size - top_k:]
+    flat_indexes = flat_indexes[np.argsort(-flat[flat_indexes], kind="stable")]
+
+    top_cells = []
+    for flat_index in flat_indexes:
+        y_index, x_index = divmod(int(flat_index), width)
+        [x, y] = dm.index_to_coords(x_index, y_index, data)
+        top_cells.append([float(flat[flat_index]), x, y])
+
+    return top_cells
+
+
+def brute_force_region(data, x1, y1, x2, y2, pyramid=None, top_k=None):
+    """
+    Brute Force restricted to a rectangle of coordinates (corners in any order, bounds included), answered by the max
+    pyramid instead of a scan of the region. The top_k highest locations are found by one batch lookup of the region.
+    :param data: data structure
+    :param x1: x-coordinate of a corner
+    :param y1: y-coordinate of a corner
+    :param x2: x-coordinate of the opposite corner
+    :param y2: y-coordinate of the opposite corner
+    :param pyramid: max pyramid (see dm.load_max_pyramid), loaded if not given
+    :param top_k: if given, the top_k highest locations are returned instead of only the highest one
+    :return: [highest altitude, x, y] in Swiss coordinates, or a list of top_k such entries (highest first, fewer if the
+             region is smaller)
+    """
+
+    # Highest location only
+    if top_k is None:
+        if pyramid is None:
+            pyramid = dm.load_max_pyramid(data)
+        return dm.region_max_coords(pyramid, x1, y1, x2, y2, data)
+
+    # Region as index ranges, clipped to the data structure
+    [rows, columns] = dm.grid_shape(data)
+    [x_index_1, y_index_1] = dm.coords_to_index(x1, y1, data)
+    [x_index_2, y_index_2] = dm.coords_to_index(x2, y2, data)
+    x_indexes = np.arange(max(min(x_index_1, x_index_2), 0), min(max(x_index_1, x_index_2), columns - 1) + 1)
+    y_indexes = np.arange(max(min(y_index_1, y_index_2), 0), min(max(y_index_1, y_index_2), rows - 1) + 1)
+    if x_indexes.size == 0 or y_indexes.size == 0 or top_k < 1:
+        return []
+
+    # Top k locations of the region, sorted by altitude (highest first)
+    [xs, ys] = np.meshgrid(x_indexes, y_indexes)
+    xs = xs.ravel()
+    ys = ys.ravel()
+    fitness = dm.get_fitness_batch(data, xs, ys)
+    top_k = min(top_k, fitness.size)
+    indexes = np.argpartition(fitness, fitness.size - top_k)[fitness.size - top_k:]
+    indexes = indexes[np.argsort(-fitness[indexes], kind="stable")]
+
+    top_cells = []
+    for index in indexes:
+        [x, y] = dm.index_to_coords(int(xs[index]), int(ys[index]), data)
+        top_cells.append([float(fitness[index]), x, y])
+
+    return top_cells
+
+
+def pure_random_search(data, number_of_evaluations, budget=None):
     """
     Evaluates the fitness (altitude) at a random location in the data structure. Repeats for a given number.
     :param data: data structure
     :param number_of_evaluations: How often the fitness of a random location is evaluated
+    :param budget: optional Budget, stops when it is used up
     :return: highest altitude found
     """
 
     # Initialize vars
     highest_altitude = 0
+    if budget is not None:
+        budget.start()
 
     # Repeat evaluation process for given number
     for i in range(0, number_of_evaluations):
         # Get random coordinates
-        coords = dm.random_coords()
+        coords = dm.random_coords(data)
 
         # Evaluate fitness (altitude)
-        index = dm.coords_to_index(coords[0], coords[1])
+        index = dm.coords_to_index(coords[0], coords[1], data)
         altitude = dm.get_fitness(data, index[0], index[1])
 
         # Store highest altitude
         if float(altitude) > highest_altitude:
             highest_altitude = float(altitude)
 
+        # Stop if budget is used up
+        if budget is not None and budget.update(1, float(altitude)):
+            break
+
     return highest_altitude
 
 
-def hill_climbing(data, restart):
+def pure_random_search_batched(data, number_of_evaluations, seed=None, chunk_size=65536):
+    """
+    Pure Random Search drawing and evaluating the random locations in chunks. Same sampling distribution as
+    pure_random_search. Same seed (and chunk size) gives the same result.
+    :param data: data structure
+    :param number_of_evaluations: How often the fitness of a random location is evaluated
+    :param seed: seed for the random generator (None: fresh seed)
+    :param chunk_size: number of random locations drawn and evaluated at once
+    :return: [highest altitude found, x, y] in Swiss coordinates (x, y None if nothing above 0 was found)
+    """
+
+    # Initialize vars
+    rng = np.random.default_rng(seed)
+    highest_altitude = 0
+    x = None
+    y = None
+
+    # Evaluate random locations chunk by chunk and keep the running maximum with its location
+    remaining = number_of_evaluations
+    while remaining > 0:
+        number = min(chunk_size, remaining)
+        remaining -= number
+
+        [x_indexes, y_indexes] = dm.random_index_batch(rng, number, data)
+        fitness = dm.get_fitness_batch(data, x_indexes, y_indexes)
+
+        best_index = int(np.argmax(fitness))
+        if fitness[best_index] > highest_altitude:
+            highest_altitude = float(fitness[best_index])
+            [x, y] = dm.index_to_coords(int(x_indexes[best_index]), int(y_indexes[best_index]), data)
+
+    return [highest_altitude, x, y]
+
+
+def hill_climbing(data, restart, budget=None):
     """
     Implementation of the Hill Climbing Optimizer.
     :param data: data structure
     :param restart: number of random restarts
+    :param budget: optional Budget, stops when it is used up
     :return: highest altitude found
     """
 
     # Initialize vars
     highest_altitude = 0
     count_evaluations = 0
+    step = dm.grid_geometry(data)[2]
+    if budget is not None:
+        budget.start()
 
     # Do evaluation process for given number of random restarts. At least once.
     for i in range(0, restart + 1):
@@ -82,17 +313,21 @@ def hill_climbing(data, restart):
         f_previous = 0
 
         # Get random coordinates for start point
-        coords = dm.random_coords()
+        coords = dm.random_coords(data)
         x = coords[0]
         y = coords[1]
 
         # Evaluate fitness (altitude) of init point
-        index = dm.coords_to_index(x, y)
+        index = dm.coords_to_index(x, y, data)
         f_now = dm.get_fitness(data, index[0], index[1])
 
         # Count number of fitness evaluations
         count_evaluations += 1
 
+        # Stop if budget is used up
+        if budget is not None and budget.update(1, f_now):
+            return [budget.best, count_evaluations]
+
         # Step to next point until a local (global) maximum is found
         while f_now > f_previous:
 
@@ -100,10 +335,10 @@ def hill_climbing(data, restart):
             f_previous = f_now
 
             # Initialize four locations nearby the current location
-            index_north = dm.coords_to_index(x, y + 200)
-            index_east = dm.coords_to_index(x + 200, y)
-            index_south = dm.coords_to_index(x, y - 200)
-            index_west = dm.coords_to_index(x - 200, y)
+            index_north = dm.coords_to_index(x, y + step, data)
+            index_east = dm.coords_to_index(x + step, y, data)
+            index_south = dm.coords_to_index(x, y - step, data)
+            index_west = dm.coords_to_index(x - step, y, data)
 
             # Evaluate fitness at these four locations
             f_north = dm.get_fitness(data, index_north[0], index_north[1])
@@ -117,15 +352,19 @@ def hill_climbing(data, restart):
             f_now = max(fitness)
             f_index = fitness.index(f_now)
 
+            # Stop if budget is used up
+            if budget is not None and budget.update(4, f_now):
+                return [budget.best, count_evaluations]
+
             # Set location of the next step to the best location nearby the current position
             if f_index == 0:
-                y += 200
+                y += step
             elif f_index == 1:
-                x += 200
+                x += step
             elif f_index == 2:
-                y -= 200
+                y -= step
             elif f_index == 3:
-                x -= 200
+                x -= step
 
         # If during the current evaluation process a better altitude is found, store it.
         if f_previous > highest_altitude:
@@ -134,74 +373,453 @@ def hill_climbing(data, restart):
     return [highest_altitude, count_evaluations]
 
 
-def plot_swarm(positions):
+def hill_climbing_vectorized(data, restart, seed=None):
     """
-    Method for plotting the swarm.
-    :param positions: Particle positions, coordinate list [[x1,y1], [x2,y2], ...]
-    :return: None
+    Hill Climbing with all random restarts climbing in lockstep. Every iteration evaluates the four locations nearby
+    every still climbing walker in one batch lookup and retires the walkers which found their local maximum.
+    Same climbing rule (north, east, south, west; first one wins on ties) and same evaluation count as hill_climbing.
+    :param data: data structure
+    :param restart: number of random restarts
+    :param seed: seed for the random generator (None: fresh seed)
+    :return: [highest altitude found, number of fitness evaluations]
     """
 
     # Initialize vars
-    x = []
-    y = []
+    rng = np.random.default_rng(seed)
+    highest_altitude = 0
 
-    # convert all given coordinates to data structure indexes
-    for element in positions:
-        index = dm.coords_to_index(element[0], element[1])
-        x.append(index[0])
-        y.append(index[1])
+    # Random start points for all walkers, at least one
+    [x, y] = dm.random_index_batch(rng, restart + 1, data)
+    f_now = dm.get_fitness_batch(data, x, y)
+    count_evaluations = restart + 1
+
+    # Walkers starting at altitude 0 do not climb at all
+    climbing = f_now > 0
+    x = x[climbing]
+    y = y[climbing]
+    f_now = f_now[climbing]
+
+    # Index offsets of the four locations nearby (north, east, south, west)
+    dx = np.array([0, 1, 0, -1])
+    dy = np.array([-1, 0, 1, 0])
+
+    # Step all walkers until every one has found a local (global) maximum
+    while x.size > 0:
+        f_previous = f_now
+
+        # Evaluate fitness at the four locations nearby every walker, shape (4, walkers)
+        x_nearby = x + dx[:, None]
+        y_nearby = y + dy[:, None]
+        fitness = dm.get_fitness_batch(data, x_nearby, y_nearby)
+        count_evaluations += 4 * x.size
+
+        # Step to the best location nearby
+        f_index = np.argmax(fitness, axis=0)
+        walkers = np.arange(x.size)
+        f_now = fitness[f_index, walkers]
+        x = x_nearby[f_index, walkers]
+        y = y_nearby[f_index, walkers]
+
+        # Retire walkers at a local maximum and store the best one
+        finished = f_now <= f_previous
+        if finished.any():
+            highest_altitude = max(highest_altitude, float(f_previous[finished].max()))
+            climbing = ~finished
+            x = x[climbing]
+            y = y[climbing]
+            f_now = f_now[climbing]
 
-    # Plot positions
-    plt.xlim(0, 1925)
-    plt.ylim(0, 1140)
-    plt.scatter(x, y)
-    time.sleep(0.1)
-    plt.show()
-    time.sleep(0.1)
+    return [highest_altitude, count_evaluations]
 
 
-def particle_swarm_optimization(data, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, plot_enable):
+def hill_climbing_basin(data, restart, basins, seed=None):
+    """
+    Hill Climbing answered from the precomputed basin index instead of climbing. Same result and same evaluation
+    count as hill_climbing / hill_climbing_vectorized for the same start points.
+    :param data: data structure
+    :param restart: number of random restarts
+    :param basins: basin index of the data structure, see dm.load_basin_index
+    :param seed: seed for the random generator (None: fresh seed)
+    :return: [highest altitude found, number of fitness evaluations the climbs would have needed]
+    """
+
+    # Initialize vars
+    rng = np.random.default_rng(seed)
+    rows, columns = dm.grid_shape(data)
+
+    # Random start points, only the ones with altitude > 0 climb
+    [x, y] = dm.random_index_batch(rng, restart + 1, data)
+    inside = (x < columns) & (y < rows)
+    peak = basins["peak"][y[inside], x[inside]]
+    steps = basins["steps"][y[inside], x[inside]]
+    climbing = peak >= 0
+
+    # One evaluation per start point, four per step and four more at the local maximum
+    count_evaluations = restart + 1 + 4 * int(np.sum(steps[climbing] + 1))
+
+    if not climbing.any():
+        return [0, count_evaluations]
+
+    # Altitude of the local maxima reached
+    x_peak = peak[climbing] % columns
+    y_peak = peak[climbing] // columns
+    return [float(dm.get_fitness_batch(data, x_peak, y_peak).max()), count_evaluations]
+
+
+def multi_resolution_search(data, start_level, beam_width, budget=None, pyramid=None):
+    """
+    Coarse-to-fine search over the max pyramid: starts with every cell of a coarse level (level k: cells of 2^k x 2^k
+    grid points, e.g. level 5 = 6.4 km) and refines only the beam_width most promising cells to the next finer level,
+    down to the 200 m grid. Every cell value is the maximum of the cell, so the most promising cells are the highest.
+    Every inspected cell counts as one fitness evaluation; the cells of the finest level are looked up in the data
+    structure itself. Building the max pyramid reads every location once (pyramid["values"][0].size evaluations); this
+    is done once per data structure and is not included in the count, so the count is not comparable to the counts of
+    HC or PRS without it.
+    :param data: data structure
+    :param start_level: pyramid level to start at (clipped to the top level)
+    :param beam_width: number of cells refined per level
+    :param budget: optional Budget, stops when it is used up (after a level)
+    :param pyramid: max pyramid (see dm.load_max_pyramid), loaded if not given
+    :return: [highest altitude, number of fitness evaluations]
+    """
+
+    # Initialize vars
+    if pyramid is None:
+        pyramid = dm.load_max_pyramid(data)
+    values = pyramid["values"]
+    level = min(start_level, len(values) - 1)
+    count_evaluations = 0
+    if budget is not None:
+        budget.start()
+
+    # All cells of the start level
+    [rows, columns] = values[level].shape
+    [i, j] = np.divmod(np.arange(rows * columns), columns)
+
+    while True:
+        # Evaluate cells of this level
+        if level == 0:
+            cell_values = dm.get_fitness_batch(data, j, i)
+        else:
+            cell_values = values[level][i, j]
+        count_evaluations += len(cell_values)
+        beam = np.argsort(-cell_values, kind="stable")[:beam_width]
+        best = float(cell_values[beam[0]])
+
+        # Finest level reached or budget used up
+        if level == 0:
+            if budget is not None:
+                budget.update(len(cell_values), best)
+            return [best, count_evaluations]
+        if budget is not None and budget.update(len(cell_values), best):
+            return [best, count_evaluations]
+
+        # Refine: the (up to) four children of every cell in the beam
+        level -= 1
+        [rows, columns] = values[level].shape
+        i = (2 * i[beam][:, None] + np.array([0, 0, 1, 1])).ravel()
+        j = (2 * j[beam][:, None] + np.array([0, 1, 0, 1])).ravel()
+        inside = (i < rows) & (j < columns)
+        i = i[inside]
+        j = j[inside]
+
+
+def simulated_annealing(data, number_of_chains, steps, t_start, t_end, number_of_temperatures=1, swap_interval=10, seed=None, budget=None):
+    """
+    Simulated Annealing with all chains stepping in lockstep. Every step proposes one random location nearby (north,
+    east, south or west, same 200 m moves as Hill Climbing) per chain, all evaluated in one batch lookup. A proposal is
+    accepted if it is not lower, otherwise with probability exp((new altitude - altitude) / temperature).
+    Chains at altitude 0 (outside of the data set) jump to a new random start point.
+    number_of_temperatures = 1: every chain cools down from t_start to t_end (geometric schedule).
+    number_of_temperatures > 1: parallel tempering, every one of the number_of_chains groups has one chain per
+    temperature of a fixed ladder from t_end (coldest) to t_start (hottest); every swap_interval steps neighbouring
+    temperatures exchange their locations with the parallel tempering acceptance probability.
+    :param data: data structure
+    :param number_of_chains: number of chains (parallel tempering: number of groups of chains)
+    :param steps: number of steps of every chain
+    :param t_start: start temperature in m (parallel tempering: hottest temperature)
+    :param t_end: end temperature in m (parallel tempering: coldest temperature)
+    :param number_of_temperatures: 1 for annealing, > 1 for parallel tempering with this many temperatures
+    :param swap_interval: parallel tempering: number of steps between two swap attempts
+    :param seed: seed for the random generator (None: fresh seed)
+    :param budget: optional Budget, stops when it is used up (after a step)
+    :return: [highest altitude found, number of fitness evaluations]
+    """
+
+    # Initialize vars
+    rng = np.random.default_rng(seed)
+    shape = (number_of_chains, number_of_temperatures)
+    if budget is not None:
+        budget.start()
+
+    # Temperature of every step (annealing) or of every chain (parallel tempering)
+    if number_of_temperatures == 1:
+        schedule = t_start * (t_end / t_start) ** (np.arange(steps) / max(steps - 1, 1))
+    else:
+        ladder = t_end * (t_start / t_end) ** (np.arange(number_of_temperatures) / (number_of_temperatures - 1))
+
+    # Random start points
+    [x, y] = dm.random_index_batch(rng, number_of_chains * number_of_temperatures, data)
+    x = x.reshape(shape)
+    y = y.reshape(shape)
+    f_now = dm.get_fitness_batch(data, x, y)
+    count_evaluations = f_now.size
+    highest_altitude = float(f_now.max())
+    if budget is not None and budget.update(f_now.size, highest_altitude):
+        return [highest_altitude, count_evaluations]
+
+    # Index offsets of the four locations nearby (north, east, south, west)
+    dx = np.array([0, 1, 0, -1])
+    dy = np.array([-1, 0, 1, 0])
+
+    for step in range(steps):
+        temperature = schedule[step] if number_of_temperatures == 1 else ladder
+
+        # Propose one location nearby per chain and evaluate all of them at once
+        with dm.profile_phase(data, "rng"):
+            direction = rng.integers(0, 4, size=shape)
+            chance = rng.random(shape)
+        x_new = x + dx[direction]
+        y_new = y + dy[direction]
+        f_new = dm.get_fitness_batch(data, x_new, y_new)
+        count_step = f_new.size
+
+        # Metropolis acceptance
+        accept = chance < np.exp(np.minimum(f_new - f_now, 0) / temperature)
+        x = np.where(accept, x_new, x)
+        y = np.where(accept, y_new, y)
+        f_now = np.where(accept, f_new, f_now)
+        f_step = float(f_new.max())
+
+        # Chains outside of the data set start again somewhere else
+        outside = f_now == 0
+        if outside.any():
+            [x_restart, y_restart] = dm.random_index_batch(rng, int(outside.sum()), data)
+            x[outside] = x_restart
+            y[outside] = y_restart
+            f_now[outside] = dm.get_fitness_batch(data, x_restart, y_restart)
+            count_step += x_restart.size
+            f_step = max(f_step, float(f_now[outside].max()))
+
+        count_evaluations += count_step
+        highest_altitude = max(highest_altitude, f_step)
+        if budget is not None and budget.update(count_step, f_step):
+            return [highest_altitude, count_evaluations]
+
+        # Parallel tempering: neighbouring temperatures swap locations (even and odd pairs alternating)
+        if number_of_temperatures > 1 and (step + 1) % swap_interval == 0:
+            cold = np.arange((step + 1) // swap_interval % 2, number_of_temperatures - 1, 2)
+            hot = cold + 1
+            probability = np.exp(np.minimum((f_now[:, hot] - f_now[:, cold]) * (1 / ladder[cold] - 1 / ladder[hot]), 0))
+            with dm.profile_phase(data, "rng"):
+                swap = rng.random(probability.shape) < probability
+            [chains, pairs] = np.nonzero(swap)
+            for values in [x, y, f_now]:
+                values[chains, cold[pairs]], values[chains, hot[pairs]] = values[chains, hot[pairs]], values[chains, cold[pairs]]
+
+    return [highest_altitude, count_evaluations]
+
+
+def differential_evolution(data, population_size, generations, weight, crossover, seed=None, budget=None):
+    """
+    Differential Evolution (DE/rand/1/bin) on the 200 m grid. For every individual a trial location is built from
+    three other random individuals a, b, c: a + weight * (b - c), rounded to the grid and kept within the random start
+    area, and then crossed over with the individual (each of x, y taken from the trial with probability crossover, at
+    least one of them). All trials of a generation are evaluated in one batch lookup and replace their individual if
+    they are not lower.
+    :param data: data structure
+    :param population_size: number of individuals (at least 4)
+    :param generations: number of generations (at least 1)
+    :param weight: differential weight (typically 0.5 - 1.0)
+    :param crossover: crossover probability (0 - 1)
+    :param seed: seed for the random generator (None: fresh seed)
+    :param budget: optional Budget, stops when it is used up (after a generation)
+    :return: [highest altitude found, number of fitness evaluations]
+    """
+
+    # Three partners distinct from each other and from the individual are needed
+    if population_size < 4:
+        raise ValueError("Differential evolution needs a population size of at least 4, got " + str(population_size))
+    if generations < 1:
+        raise ValueError("Differential evolution needs at least 1 generation, got " + str(generations))
+
+    # Initialize vars
+    rng = np.random.default_rng(seed)
+    individuals = np.arange(population_size)
+    upper = np.array(dm.random_index_range(data))
+    if budget is not None:
+        budget.start()
+
+    # Random start population, shape (individuals, 2) with columns x-index, y-index
+    [x, y] = dm.random_index_batch(rng, population_size, data)
+    positions = np.stack([x, y], axis=1)
+    fitness = dm.get_fitness_batch(data, x, y)
+    count_evaluations = population_size
+    if budget is not None and budget.update(population_size, float(fitness.max())):
+        return [float(fitness.max()), count_evaluations]
+
+    for generation in range(generations):
+        with dm.profile_phase(data, "rng"):
+            # Three distinct partners per individual, none of them the individual itself
+            offsets = rng.integers(1, population_size, size=(3, population_size))
+            same = (offsets[0] == offsets[1]) | (offsets[0] == offsets[2]) | (offsets[1] == offsets[2])
+            while same.any():
+                offsets[:, same] = rng.integers(1, population_size, size=(3, int(same.sum())))
+                same = (offsets[0] == offsets[1]) | (offsets[0] == offsets[2]) | (offsets[1] == offsets[2])
+            [a, b, c] = (individuals + offsets) % population_size
+
+            # Binomial crossover, at least one coordinate from the mutant
+            take = rng.random((population_size, 2)) < crossover
+            take[individuals, rng.integers(0, 2, size=population_size)] = True
+
+        # Mutation, snapped to the grid
+        mutants = np.rint(positions[a] + weight * (positions[b] - positions[c])).astype(positions.dtype)
+        mutants = np.clip(mutants, 0, upper)
+        trials = np.where(take, mutants, positions)
+
+        # Evaluate the whole generation at once, keep trials which are not lower
+        f_trials = dm.get_fitness_batch(data, trials[:, 0], trials[:, 1])
+        count_evaluations += population_size
+        better = f_trials >= fitness
+        positions[better] = trials[better]
+        fitness[better] = f_trials[better]
+
+        if budget is not None and budget.update(population_size, float(f_trials.max())):
+            break
+
+    return [float(fitness.max()), count_evaluations]
+
+
+def _record_swarm(frames, positions, best):
+    """
+    Appends the swarm of one time step to the frame buffer (a copy, the run goes on with its own positions).
+    :param frames: frame buffer (list)
+    :param positions: Particle positions, coordinate list [[x1,y1], [x2,y2], ...] or (n, 2) coordinate array
+    :param best: best altitude found so far
+    :return: None
+    """
+    frames.append([np.array(positions, dtype=float), best])
+
+
+def plot_swarm(positions, data=None, axes=None):
+    """
+    Method for plotting the swarm.
+    :param positions: Particle positions, coordinate list [[x1,y1], [x2,y2], ...] or (n, 2) coordinate array
+    :param data: optional data structure with its own geometry (e.g. dm.TiledGrid)
+    :param axes: optional matplotlib axes to draw into (None: new figure, shown at once)
+    :return: None
+    """
+    import matplotlib.pyplot as plt
+
+    # convert all given coordinates to data structure indexes
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    [x, y] = dm.coords_to_index_batch(positions[:, 0], positions[:, 1], data)
+
+    # Plot positions
+    [x_max, y_max] = dm.random_index_range(data)
+    show = axes is None
+    if show:
+        axes = plt.figure().gca()
+    axes.set_xlim(0, x_max)
+    axes.set_ylim(0, y_max)
+    axes.scatter(x, y)
+    if show:
+        plt.show()
+
+
+def plot_swarm_frames(frames, data=None, animation_path=None, interval=300):
+    """
+    Plots the swarm frames recorded by a PSO run (plot_enable), one after the other, together with the best altitude
+    found so far. Call it after the run, so plotting is not part of the measured time.
+    :param frames: frame buffer of the PSO run, one [coordinate array, best altitude] per time step
+    :param data: optional data structure with its own geometry (e.g. dm.TiledGrid)
+    :param animation_path: if given, the frames are written to this animation file (e.g. .gif) instead of shown
+    :param interval: time between two frames of the animation in ms
+    :return: None
+    """
+    if not frames:
+        return
+
+    # Show every time step
+    if animation_path is None:
+        for [positions, best] in frames:
+            print(best)
+            plot_swarm(positions, data)
+        return
+
+    # Write all time steps to one animation file. The figure is drawn on its own Agg canvas, without pyplot, so the
+    # backend of the process (e.g. for later interactive plots) is left as it is.
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.animation import FuncAnimation
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.gca()
+
+    def draw(m):
+        axes.clear()
+        axes.set_title("Time step " + str(m) + ", best altitude: " + str(frames[m][1]))
+        plot_swarm(frames[m][0], data, axes)
+
+    animation = FuncAnimation(figure, draw, frames=len(frames), interval=interval)
+    animation.save(animation_path, writer="pillow")
+
+
+def particle_swarm_optimization(data, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, plot_enable, budget=None):
     """
     Implements the Particle Swarm Optimizer.
     :param data: data structure
     :param number_of_particles: How many particles are initialized for building a swarm
     :param time_steps: How often the particles move
-    :param v_inertia: Base velocity
+    :param v_inertia: Base velocity [x, y] in steps (x east, y north)
     :param v_best_global: velocity towards the global maximum
     :param v_best_local: velocity towards the local maximum
     :param v_swarm_center: velocity towards the swarm center
     :param enable_hc: enable hill climbing modification (True/False)
     :param number_of_hc_elements: number of elements which will do hill climbing (always the best ones will do it)
-    :param plot_enable: enable if swarm is plotted at each time step (True/False)
+    :param plot_enable: record the swarm at each time step: False, a list (frame buffer, see plot_swarm_frames) or True
+                        (recorded frames are plotted at the end of the run, i.e. within its time)
+    :param budget: optional Budget, stops when it is used up
     :return: highest altitude found
     """
 
     # Initialize vars
+    frames = plot_enable if isinstance(plot_enable, list) else ([] if plot_enable else None)
     positions = []
     pm_best = []
     fitness_list = []
     vm = [[0, 0]] * number_of_particles
     count_evaluations = 0
+    count_budget = 0  # Evaluations already reported to the budget
+    if budget is not None:
+        budget.start()
 
-    # Convert steps to 200m-grid
-    v_best_local *= 200
-    v_best_global *= 200
-    v_swarm_center *= 200
+    # Convert steps to the grid (200 m for DHM200)
+    step = dm.grid_geometry(data)[2]
+    v_inertia = [v_inertia[0] * step, v_inertia[1] * step]
+    v_best_local *= step
+    v_best_global *= step
+    v_swarm_center *= step
 
     # Initialize start positions
     for i in range(number_of_particles):
-        init_position = dm.random_coords()
+        init_position = dm.random_coords(data)
         positions.append(init_position)
         pm_best = positions
 
     # Evaluate fitness for start positions and set p_global
     for element in pm_best:
-        index = dm.coords_to_index(element[0], element[1])
+        index = dm.coords_to_index(element[0], element[1], data)
         fitness_list.append(dm.get_fitness(data, index[0], index[1]))
         count_evaluations += 1
 
-    # Store the best fitness values in a list, needed for hill climbing modification
-    best_fitness_values = dm.best_m_values_in_list(fitness_list, number_of_hc_elements)
+    # Stop if budget is used up
+    if budget is not None and budget.update(count_evaluations, max(fitness_list)):
+        return [budget.best, count_evaluations]
+    count_budget = count_evaluations
+
+    # Store the best fitness values in a set, needed for hill climbing modification
+    best_fitness_values = set(dm.best_m_values_in_list(fitness_list, number_of_hc_elements))
 
     # Evaluate the currently best position and store as p_global
     best_fitness_index = fitness_list.index(max(fitness_list))
@@ -214,30 +832,41 @@ def particle_swarm_optimization(data, number_of_particles, time_steps, v_inertia
         fitness_list = []
 
         # Create a list with all current x and y coordinates from positions
-        x_positions = []
-        y_positions = []
-        for element in positions:
-            x_positions.append(element[0])
-            y_positions.append(element[1])
+        x_positions = [element[0] for element in positions]
+        y_positions = [element[1] for element in positions]
+
+        # Force towards the center of the swarm, computed once per time step for all particles (array form).
+        # Implementation: force towards center if pos > st. deviation
+        st_dev_x_position = stdev(x_positions)
+        st_dev_y_position = stdev(y_positions)
+        mean_x_position = mean(x_positions)
+        mean_y_position = mean(y_positions)
+        x_positions = np.array(x_positions)
+        y_positions = np.array(y_positions)
+        v_swarm_center_x_list = np.where(np.abs(x_positions - mean_x_position) > st_dev_x_position,
+                                         np.where(x_positions > mean_x_position, -v_swarm_center, v_swarm_center), 0)
+        v_swarm_center_y_list = np.where(np.abs(y_positions - mean_y_position) > st_dev_y_position,
+                                         np.where(y_positions > mean_y_position, -v_swarm_center, v_swarm_center), 0)
 
         # Set new velocity and position for each element (particle)
         i = 0  # counter
         for element in positions:
 
             # Hill Climbing modification for a given number of best elements
-            index = dm.coords_to_index(element[0], element[1])
+            index = dm.coords_to_index(element[0], element[1], data)
             f_element = dm.get_fitness(data, index[0], index[1])
             count_evaluations += 1
+            f_particle = f_element  # Best fitness evaluated for this particle (budget trace)
             if enable_hc and f_element in best_fitness_values:
                 # Current element position
                 x = element[0]
                 y = element[1]
 
                 # Initialize four locations nearby the current location
-                index_north = dm.coords_to_index(x, y + 200)
-                index_east = dm.coords_to_index(x + 200, y)
-                index_south = dm.coords_to_index(x, y - 200)
-                index_west = dm.coords_to_index(x - 200, y)
+                index_north = dm.coords_to_index(x, y + step, data)
+                index_east = dm.coords_to_index(x + step, y, data)
+                index_south = dm.coords_to_index(x, y - step, data)
+                index_west = dm.coords_to_index(x - step, y, data)
 
                 # Evaluate fitness at these four locations
                 f_north = dm.get_fitness(data, index_north[0], index_north[1])
@@ -250,23 +879,24 @@ def particle_swarm_optimization(data, number_of_particles, time_steps, v_inertia
                 fitness = [f_north, f_east, f_south, f_west]
                 f_new = max(fitness)
                 f_index = fitness.index(f_new)
+                f_particle = max(f_particle, f_new)
 
                 # Set location of the next step to the best location nearby the current position
                 if f_index == 0:
-                    y += 200
+                    y += step
                 elif f_index == 1:
-                    x += 200
+                    x += step
                 elif f_index == 2:
-                    y -= 200
+                    y -= step
                 elif f_index == 3:
-                    x -= 200
+                    x -= step
 
                 # Choose new position if fitness is better there
                 if f_new > f_element:
                     positions[i] = [x, y]
 
                 # Evaluate if new position is better than p_global
-                index = dm.coords_to_index(p_global[0], p_global[1])
+                index = dm.coords_to_index(p_global[0], p_global[1], data)
                 f_global = dm.get_fitness(data, index[0], index[1])
                 count_evaluations += 1
                 if f_new > f_global:
@@ -274,27 +904,9 @@ def particle_swarm_optimization(data, number_of_particles, time_steps, v_inertia
 
             # Not HC for all other particles
             else:
-                # Force towards the center of the swarm. Implementation: force towards center if pos > st. deviation
-                st_dev_x_position = stdev(x_positions)
-                st_dev_y_position = stdev(y_positions)
-                mean_x_position = mean(x_positions)
-                mean_y_position = mean(y_positions)
-                v_swarm_center_x = 0
-                v_swarm_center_y = 0
-
-                # x-position change
-                if abs(element[0] - mean_x_position) > st_dev_x_position:
-                    if element[0] > mean_x_position:
-                        v_swarm_center_x = -v_swarm_center
-                    else:
-                        v_swarm_center_x = v_swarm_center
-
-                # y-position change
-                if abs(element[1] - mean_y_position) > st_dev_y_position:
-                    if element[1] > mean_y_position:
-                        v_swarm_center_y = -v_swarm_center
-                    else:
-                        v_swarm_center_y = v_swarm_center
+                # Force towards the center of the swarm (computed for all particles above)
+                v_swarm_center_x = int(v_swarm_center_x_list[i])
+                v_swarm_center_y = int(v_swarm_center_y_list[i])
 
                 # Force towards p_global
                 if element[0] > p_global[0]:
@@ -326,14 +938,15 @@ def particle_swarm_optimization(data, number_of_particles, time_steps, v_inertia
                 positions[i] = [positions[i][0] + vm[i][0], positions[i][1] + vm[i][1]]
 
                 # Evaluate previous best fitness of current particle
-                index = dm.coords_to_index(pm_best[i][0], pm_best[i][1])
+                index = dm.coords_to_index(pm_best[i][0], pm_best[i][1], data)
                 fitness_old = dm.get_fitness(data, index[0], index[1])
                 count_evaluations += 1
 
                 # Evaluate fitness at new position of current particle
-                index = dm.coords_to_index(positions[i][0], positions[i][1])
+                index = dm.coords_to_index(positions[i][0], positions[i][1], data)
                 fitness_new = dm.get_fitness(data, index[0], index[1])
                 count_evaluations += 1
+                f_particle = max(f_particle, fitness_new)
 
                 # If new fitness is better than before, update pm_best (best location of current particle)
                 if fitness_new > fitness_old:
@@ -342,29 +955,370 @@ def particle_swarm_optimization(data, number_of_particles, time_steps, v_inertia
             # Update counter
             i += 1
 
+            # Stop if budget is used up
+            if budget is not None and budget.update(count_evaluations - count_budget, f_particle):
+                break
+            count_budget = count_evaluations
+
+        if budget is not None and budget.exhausted():
+            break
+
         # Update fitness list for next time step
         for element in pm_best:
-            index = dm.coords_to_index(element[0], element[1])
+            index = dm.coords_to_index(element[0], element[1], data)
             fitness_list.append(dm.get_fitness(data, index[0], index[1]))
             count_evaluations += 1
 
         # Update best fitness values for next step (for HC modification)
-        best_fitness_values = dm.best_m_values_in_list(fitness_list, number_of_hc_elements)
+        best_fitness_values = set(dm.best_m_values_in_list(fitness_list, number_of_hc_elements))
 
         # Update best global position
-        index = dm.coords_to_index(p_global[0], p_global[1])
+        index = dm.coords_to_index(p_global[0], p_global[1], data)
         count_evaluations += 1
         if max(fitness_list) > dm.get_fitness(data, index[0], index[1]):
             best_fitness_index = fitness_list.index(max(fitness_list))
             p_global = pm_best[best_fitness_index]
 
-        # Plot all particle positions (swarm) if enabled
-        if plot_enable:
-            print(dm.get_fitness(data, index[0], index[1]))
-            plot_swarm(positions)
-            time.sleep(0.2)
+        # Record all particle positions (swarm) if enabled, plotted after the run
+        if frames is not None:
+            with dm.profile_phase(data, "plotting"):
+                _record_swarm(frames, positions, dm.get_fitness(data, index[0], index[1]))
+
+        # Stop if budget is used up
+        if budget is not None and budget.update(count_evaluations - count_budget, max(fitness_list)):
+            break
+        count_budget = count_evaluations
+
+    # Frames recorded into an own buffer (plot_enable=True) are plotted at the end of the run
+    if frames is not None and frames is not plot_enable:
+        plot_swarm_frames(frames, data)
+
+    # Best fitness evaluated so far if the budget is used up
+    if budget is not None and budget.exhausted():
+        return [budget.best, count_evaluations]
 
     # Evaluate fitness of p_global at the end of the whole PSO process and return it
-    index = dm.coords_to_index(p_global[0], p_global[1])
+    index = dm.coords_to_index(p_global[0], p_global[1], data)
     count_evaluations += 1
     return [dm.get_fitness(data, index[0], index[1]), count_evaluations]
+
+
+def _swarm_lookup(data, swarm, x, y):
+    """
+    Evaluates fitness for the PSO engine and keeps track of raw lookups and of the looked up locations.
+    :param data: data structure
+    :param swarm: swarm state, see _swarm_initialize
+    :param x: x-index array
+    :param y: y-index array
+    :return: altitude array
+    """
+    swarm["count_lookups"] += x.size
+
+    # Locations outside of the data structure return 0 without a lookup, they are not counted as unique locations
+    [rows, columns] = dm.grid_shape(data)
+    x = np.asarray(x)
+    y = np.asarray(y)
+    inside = (x >= 0) & (y >= 0) & (x < columns) & (y < rows)
+    swarm["looked_up"].append(y[inside] * 2 ** 32 + x[inside])
+    return dm.get_fitness_batch(data, x, y)
+
+
+def _swarm_initialize(data, number_of_particles, number_of_hc_elements, rng):
+    """
+    Initializes the swarm state for particle_swarm_optimization_vectorized. Positions are data structure indexes.
+    :param data: data structure
+    :param number_of_particles: How many particles are initialized for building a swarm
+    :param number_of_hc_elements: number of elements which will do hill climbing (always the best ones will do it)
+    :param rng: numpy random generator
+    :return: swarm state (dict of arrays)
+    """
+
+    swarm = {"count_lookups": 0, "looked_up": []}
+
+    # Random start positions, shape (particles, 2) with columns x-index, y-index
+    [x, y] = dm.random_index_batch(rng, number_of_particles, data)
+    swarm["positions"] = np.stack([x, y], axis=1)
+    swarm["fitness"] = _swarm_lookup(data, swarm, x, y)
+    swarm["velocities"] = np.zeros_like(swarm["positions"])
+
+    # Personal best positions are a copy, not the same array as the positions
+    swarm["pm_best"] = swarm["positions"].copy()
+    swarm["pm_best_fitness"] = swarm["fitness"].copy()
+
+    # Global best and best fitness values (for HC modification)
+    _swarm_update_best(swarm, number_of_hc_elements)
+
+    return swarm
+
+
+def _swarm_update_best(swarm, number_of_hc_elements):
+    """
+    Updates the best fitness values (for HC modification) and p_global from the personal bests, once per time step.
+    :param swarm: swarm state, see _swarm_initialize
+    :param number_of_hc_elements: number of elements which will do hill climbing (always the best ones will do it)
+    :return: None
+    """
+    pm_best_fitness = swarm["pm_best_fitness"]
+    m = min(number_of_hc_elements, pm_best_fitness.size)
+    swarm["best_fitness_values"] = np.partition(pm_best_fitness, pm_best_fitness.size - m)[pm_best_fitness.size - m:]
+
+    best_index = int(np.argmax(pm_best_fitness))
+    if "p_global" not in swarm or pm_best_fitness[best_index] > swarm["f_global"]:
+        swarm["p_global"] = swarm["pm_best"][best_index].copy()
+        swarm["f_global"] = float(pm_best_fitness[best_index])
+
+
+def _swarm_time_step(data, swarm, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc,
+                     number_of_hc_elements):
+    """
+    Moves all particles of the swarm once (one PSO time step), see particle_swarm_optimization_vectorized.
+    :return: None
+    """
+
+    positions = swarm["positions"]
+    fitness = swarm["fitness"]
+
+    # Particles among the best ones do hill climbing, all others move
+    if enable_hc:
+        hc = np.isin(fitness, swarm["best_fitness_values"])
+    else:
+        hc = np.zeros(fitness.size, dtype=bool)
+    move = ~hc
+
+    # Swarm statistics from the positions at the beginning of the time step
+    mean_position = positions.mean(axis=0)
+    st_dev_position = positions.std(axis=0, ddof=1) if positions.shape[0] > 1 else np.zeros(2)
+
+    # Hill Climbing modification: evaluate four locations nearby every HC particle (north, east, south, west)
+    if hc.any():
+        hc_indexes = np.nonzero(hc)[0]
+        x_nearby = positions[hc_indexes, 0] + np.array([0, 1, 0, -1])[:, None]
+        y_nearby = positions[hc_indexes, 1] + np.array([-1, 0, 1, 0])[:, None]
+        f_nearby = _swarm_lookup(data, swarm, x_nearby, y_nearby)
+        f_index = np.argmax(f_nearby, axis=0)
+        columns = np.arange(hc_indexes.size)
+        f_new = f_nearby[f_index, columns]
+        x_new = x_nearby[f_index, columns]
+        y_new = y_nearby[f_index, columns]
+
+        # Choose new position if fitness is better there
+        better = f_new > fitness[hc_indexes]
+        positions[hc_indexes[better], 0] = x_new[better]
+        positions[hc_indexes[better], 1] = y_new[better]
+        fitness[hc_indexes[better]] = f_new[better]
+
+        # Update pm_best if the new fitness is better than the known personal best fitness
+        better = f_new > swarm["pm_best_fitness"][hc_indexes]
+        swarm["pm_best"][hc_indexes[better], 0] = x_new[better]
+        swarm["pm_best"][hc_indexes[better], 1] = y_new[better]
+        swarm["pm_best_fitness"][hc_indexes[better]] = f_new[better]
+
+        # New p_global if better than the current one
+        best = int(np.argmax(f_new))
+        if f_new[best] > swarm["f_global"]:
+            swarm["p_global"] = np.array([x_new[best], y_new[best]])
+            swarm["f_global"] = float(f_new[best])
+
+    # All other particles: velocity towards swarm center, p_global and pm_best
+    if move.any():
+        moving = positions[move]
+
+        # Force towards center if pos > st. deviation
+        v_center = np.where(np.abs(moving - mean_position) > st_dev_position,
+                            np.where(moving > mean_position, -v_swarm_center, v_swarm_center), 0)
+        v_global = np.where(moving > swarm["p_global"], -v_best_global, v_best_global)
+        v_local = np.where(moving > swarm["pm_best"][move], -v_best_local, v_best_local)
+        # v_inertia is given in coordinate directions, the y-index grows southwards
+        velocities = np.array([v_inertia[0], -v_inertia[1]]) + v_center + v_global + v_local
+        swarm["velocities"][move] = velocities
+
+        # New positions and their fitness
+        moving = moving + velocities
+        positions[move] = moving
+        f_moving = _swarm_lookup(data, swarm, moving[:, 0], moving[:, 1])
+        fitness[move] = f_moving
+
+        # Update pm_best if the new fitness is better than the known personal best fitness
+        move_indexes = np.nonzero(move)[0]
+        better = f_moving > swarm["pm_best_fitness"][move_indexes]
+        swarm["pm_best"][move_indexes[better]] = moving[better]
+        swarm["pm_best_fitness"][move_indexes[better]] = f_moving[better]
+
+    # Best fitness values and p_global for the next time step
+    _swarm_update_best(swarm, number_of_hc_elements)
+
+
+def particle_swarm_optimization_vectorized(data, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, plot_enable, seed=None):
+    """
+    Particle Swarm Optimizer with all particles in arrays. Same swarm rules as particle_swarm_optimization, but all
+    particles move at once (HC particles first, then all others) and known fitness values (current positions, pm_best,
+    p_global) are kept in arrays instead of being looked up again. Positions are data structure indexes, so all
+    velocities are in steps; v_inertia has the same direction as in particle_swarm_optimization (y north, i.e. towards
+    smaller y-indexes).
+    :param data: data structure
+    :param number_of_particles: How many particles are initialized for building a swarm
+    :param time_steps: How often the particles move
+    :param v_inertia: Base velocity [x, y] in steps (x east, y north)
+    :param v_best_global: velocity towards the global maximum in steps
+    :param v_best_local: velocity towards the local maximum in steps
+    :param v_swarm_center: velocity towards the swarm center in steps
+    :param enable_hc: enable hill climbing modification (True/False)
+    :param number_of_hc_elements: number of elements which will do hill climbing (always the best ones will do it)
+    :param plot_enable: record the swarm at each time step: False, a list (frame buffer, see plot_swarm_frames) or True
+                        (recorded frames are plotted at the end of the run, i.e. within its time)
+    :param seed: seed for the random generator (None: fresh seed)
+    :return: [highest altitude found, number of fitness lookups, number of unique locations evaluated]
+    """
+
+    # Initialize swarm
+    frames = plot_enable if isinstance(plot_enable, list) else ([] if plot_enable else None)
+    rng = np.random.default_rng(seed)
+    swarm = _swarm_initialize(data, number_of_particles, number_of_hc_elements, rng)
+
+    # Repeat the swarm process for a given number of time steps
+    for m in range(time_steps):
+        _swarm_time_step(data, swarm, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc,
+                         number_of_hc_elements)
+
+        # Record all particle positions (swarm) if enabled, plotted after the run
+        if frames is not None:
+            with dm.profile_phase(data, "plotting"):
+                [x, y] = dm.index_to_coords(swarm["positions"][:, 0], swarm["positions"][:, 1], data)
+                _record_swarm(frames, np.stack([x, y], axis=1), swarm["f_global"])
+
+    # Frames recorded into an own buffer (plot_enable=True) are plotted at the end of the run
+    if frames is not None and frames is not plot_enable:
+        plot_swarm_frames(frames, data)
+
+    count_unique = np.unique(np.concatenate(swarm["looked_up"])).size
+
+    return [swarm["f_global"], swarm["count_lookups"], count_unique]
+
+
+def _swarm_migrate(swarm, position, fitness, number_of_hc_elements):
+    """
+    Replaces the worst particle of the swarm by a migrant (the global best of another swarm), if the migrant is better.
+    The migrant was evaluated by the other swarm, so it is not looked up again.
+    :param swarm: swarm state, see _swarm_initialize
+    :param position: position of the migrant [x-index, y-index]
+    :param fitness: fitness of the migrant
+    :param number_of_hc_elements: number of elements which will do hill climbing (always the best ones will do it)
+    :return: None
+    """
+    worst = int(np.argmin(swarm["pm_best_fitness"]))
+    if fitness <= swarm["pm_best_fitness"][worst]:
+        return
+
+    swarm["positions"][worst] = position
+    swarm["fitness"][worst] = fitness
+    swarm["velocities"][worst] = 0
+    swarm["pm_best"][worst] = position
+    swarm["pm_best_fitness"][worst] = fitness
+    _swarm_update_best(swarm, number_of_hc_elements)
+
+
+def _island_worker(data, number_of_islands, migration_interval, number_of_particles, time_steps, v_inertia,
+                   v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, seed, receive, send,
+                   result):
+    """
+    Runs one swarm (island) of particle_swarm_optimization_islands in a worker process. Every migration_interval time
+    steps the global best is sent to the next island and the one of the previous island is received (ring).
+    :param data: data structure (None: map the binary grid cache, see dm.open_grid_memmap)
+    :param seed: numpy SeedSequence of this island
+    :param receive: connection from the previous island
+    :param send: connection to the next island
+    :param result: connection to the calling process, receives [f_global, number of lookups, looked up locations]
+    :return: None
+    """
+    if data is None:
+        data = dm.open_grid_memmap()
+
+    # Initialize swarm
+    rng = np.random.default_rng(seed)
+    swarm = _swarm_initialize(data, number_of_particles, number_of_hc_elements, rng)
+
+    for m in range(time_steps):
+        _swarm_time_step(data, swarm, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc,
+                         number_of_hc_elements)
+
+        # Migration of the best particle along the ring
+        if number_of_islands > 1 and (m + 1) % migration_interval == 0:
+            send.send([swarm["p_global"], swarm["f_global"]])
+            [position, fitness] = receive.recv()
+            _swarm_migrate(swarm, position, fitness, number_of_hc_elements)
+
+    result.send([swarm["f_global"], swarm["count_lookups"], np.unique(np.concatenate(swarm["looked_up"]))])
+
+
+def particle_swarm_optimization_islands(data, number_of_islands, migration_interval, number_of_particles, time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc, number_of_hc_elements, seed=None):
+    """
+    Island model of particle_swarm_optimization_vectorized: number_of_islands independent swarms run in worker
+    processes over the same data structure and every migration_interval time steps each swarm sends its best particle
+    to the next swarm (ring of pipes). The migrant replaces the worst particle of the receiving swarm if it is better.
+    Workers are forked where available and share the data structure, otherwise they map the binary grid cache.
+    :param data: data structure
+    :param number_of_islands: number of swarms (worker processes, at least 1)
+    :param migration_interval: number of time steps between two migrations (at least 1)
+    :param number_of_particles: How many particles are initialized per swarm
+    :param time_steps: How often the particles move
+    :param v_inertia: Base velocity [x, y] in steps (x east, y north)
+    :param v_best_global: velocity towards the global maximum (of the own swarm) in steps
+    :param v_best_local: velocity towards the local maximum in steps
+    :param v_swarm_center: velocity towards the swarm center in steps
+    :param enable_hc: enable hill climbing modification (True/False)
+    :param number_of_hc_elements: number of elements per swarm which will do hill climbing
+    :param seed: seed from which the seeds of all swarms are derived (None: fresh seed)
+    :return: [highest altitude found, number of fitness lookups (all swarms), number of unique locations evaluated]
+    """
+
+    # Checked here, an error in a worker process would only show up as a broken pipe
+    if number_of_islands < 1:
+        raise ValueError("Island model needs at least 1 island, got " + str(number_of_islands))
+    if migration_interval < 1:
+        raise ValueError("Island model needs a migration interval of at least 1 time step, got " + str(migration_interval))
+
+    # Forked workers share the data structure instead of receiving a pickled copy, others map the binary grid cache
+    context = dm.process_context()
+    if context.get_start_method() == "fork":
+        worker_data = data
+    else:
+        dm.open_grid_memmap()
+        worker_data = None
+
+    # Ring of pipes: island i sends to island i + 1
+    rings = [context.Pipe(duplex=False) for i in range(number_of_islands)]
+    results = [context.Pipe(duplex=False) for i in range(number_of_islands)]
+    seeds = np.random.SeedSequence(seed).spawn(number_of_islands)
+
+    islands = []
+    for i in range(number_of_islands):
+        island = context.Process(target=_island_worker,
+                                 args=(worker_data, number_of_islands, migration_interval, number_of_particles,
+                                       time_steps, v_inertia, v_best_global, v_best_local, v_swarm_center, enable_hc,
+                                       number_of_hc_elements, seeds[i], rings[i - 1][0], rings[i][1], results[i][1]))
+        island.start()
+        islands.append(island)
+
+    # Only the islands use the pipes (a failing island then ends the receive below with an EOFError)
+    for [receive, send] in rings:
+        receive.close()
+        send.close()
+    for [receive, send] in results:
+        send.close()
+
+    # Merge results of all islands
+    f_global = 0
+    count_lookups = 0
+    looked_up = []
+    for [receive, send] in results:
+        [f_island, count_island, looked_up_island] = receive.recv()
+        f_global = max(f_global, f_island)
+        count_lookups += count_island
+        looked_up.append(looked_up_island)
+
+    for island in islands:
+        island.join()
+
+    count_unique = np.unique(np.concatenate(looked_up)).size
+
+    return [f_global, count_lookups, count_unique]
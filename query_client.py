@@ -0,0 +1,148 @@
+"""
+    This python file is the client of the resident query server (query_server.py). It only needs the standard library,
+    so other tools can use it without numpy.
+    Requests are pipelined: many requests are written before the first response is read, so a batch of queries costs
+    one round trip. Responses come back in the order of the requests.
+     - QueryClient      Connection to the query server: elevations, region_top_k, optimize, info, pipeline
+
+    Example:
+        with QueryClient() as client:
+            altitudes = client.elevations([[670000, 260600], [600000, 200000]])
+            [top_cells, result] = client.pipeline([["region_top_k", {"x1": 660000, "y1": 250000, "x2": 680000,
+                                                                     "y2": 270000, "k": 5}],
+                                                   ["optimize", {"optimizer": "hc", "parameters": {"restart": 1000}}]])
+"""
+
+import json
+import socket
+
+# Global vars
+SOCKET_PATH = "./data/query_server.sock"  # Unix socket of the query server
+
+
+class QueryClient:
+    """
+    Connection to the query server. Every method sends one request (one JSON line) and reads its response; pipeline
+    sends many requests before reading their responses. Errors reported by the server are raised as ValueError.
+    """
+
+    def __init__(self, socket_path=SOCKET_PATH, timeout=None):
+        """
+        :param socket_path: path to the Unix socket of the query server
+        :param timeout: socket timeout in s (None: wait as long as needed, e.g. for optimizer runs)
+        """
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(socket_path)
+        self.file = self.socket.makefile("rwb")
+        self.count_requests = 0
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, method, **params):
+        """
+        Writes one request without waiting for its response (buffered until receive or flush).
+        :param method: "elevations", "region_top_k", "optimize" or "info"
+        :param params: parameters of the method
+        :return: id of the request
+        """
+        self.count_requests += 1
+        line = json.dumps({"id": self.count_requests, "method": method, "params": params}) + "\n"
+        self.file.write(line.encode())
+        return self.count_requests
+
+    def receive(self):
+        """
+        Reads the response of the oldest request which has no response yet.
+        :return: response {"id": ..., "result": ...} or {"id": ..., "error": ...}
+        """
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Query server closed the connection")
+        return json.loads(line)
+
+    def call(self, method, **params):
+        """
+        Sends one request and waits for its result.
+        :return: result of the request
+        """
+        self.send(method, **params)
+        return _result(self.receive())
+
+    def pipeline(self, requests, window=64):
+        """
+        Sends many requests and returns their results, without waiting for a response before the next request is sent.
+        At most window requests are on their way, so that neither side blocks on a full socket buffer.
+        :param requests: list of [method, params dict]
+        :param window: largest number of requests sent but not answered yet
+        :return: list of results, in order of requests
+        """
+        responses = []
+        pending = 0
+        for [method, params] in requests:
+            self.send(method, **params)
+            pending += 1
+            if pending >= window:
+                responses.append(self.receive())
+                pending -= 1
+        for i in range(pending):
+            responses.append(self.receive())
+
+        # All responses are read before an error is raised, so the connection can be used further
+        return [_result(response) for response in responses]
+
+    def elevations(self, coordinates):
+        """
+        :param coordinates: coordinate list [[x1,y1], [x2,y2], ...]
+        :return: list of altitudes (0 outside of the data set)
+        """
+        return self.call("elevations", coordinates=coordinates)
+
+    def region_top_k(self, x1, y1, x2, y2, k=1):
+        """
+        :param x1: x-coordinate of a corner
+        :param y1: y-coordinate of a corner
+        :param x2: x-coordinate of the opposite corner
+        :param y2: y-coordinate of the opposite corner
+        :param k: number of locations
+        :return: list of [altitude, x, y] (highest first) of the k highest locations in the rectangle
+        """
+        return self.call("region_top_k", x1=x1, y1=y1, x2=x2, y2=y2, k=k)
+
+    def optimize(self, optimizer, parameters=None, seed=None, vectorized=True, max_evaluations=None, max_time=None):
+        """
+        Runs one optimizer on the server, see evaluation.run_optimizer.
+        :param optimizer: "bf", "prs", "hc", "pso", "mrs", "sa" or "de"
+        :param parameters: dict with the parameters of the optimizer function
+        :param seed: seed of the run
+        :param vectorized: use the vectorized engine of the optimizer
+        :param max_evaluations: evaluation budget (None: no limit)
+        :param max_time: time budget in ms (None: no limit)
+        :return: [highest altitude found, number of fitness evaluations, time in ms]
+        """
+        return self.call("optimize", optimizer=optimizer, parameters=parameters or {}, seed=seed, vectorized=vectorized,
+                         max_evaluations=max_evaluations, max_time=max_time)
+
+    def info(self):
+        """
+        :return: {"shape": [rows, columns], "geometry": [x_min, y_max, step]} of the data set of the server
+        """
+        return self.call("info")
+
+
+def _result(response):
+    """
+    Returns the result of a response, raises ValueError with the message of the server for an error.
+    """
+    if "error" in response:
+        raise ValueError(response["error"])
+    return response["result"]
@@ -0,0 +1,214 @@
+"""
+    This python file runs a resident query server: the data set is loaded once and then answers queries of other
+    processes over a Unix socket, so they neither pay the load time nor keep their own copy of the grid.
+    Use query_client.QueryClient to connect.
+
+    Protocol: newline-delimited JSON. Every request is one line {"id": ..., "method": ..., "params": {...}}, every
+    response is one line {"id": ..., "result": ...} or {"id": ..., "error": "..."}. Responses of a connection are sent
+    in the order of its requests, so a client can pipeline many requests before reading the responses.
+    Methods:
+     - elevations       {"coordinates": [[x1,y1], ...]} -> list of altitudes (one batch lookup)
+     - region_top_k     {"x1", "y1", "x2", "y2", "k": 1} -> list of [altitude, x, y], highest first
+                        (k = 1: max pyramid, see opt.brute_force_region)
+     - optimize         {"optimizer", "parameters": {}, "seed": None, "vectorized": True, "max_evaluations": None,
+                         "max_time": None} -> [highest altitude, number of fitness evaluations, time in ms]
+                        (see evaluation.run_optimizer, pso: plot_enable must be false)
+     - info             {} -> {"shape": [rows, columns], "geometry": [x_min, y_max, step]}
+
+    Functions:
+     - handle_request   Answers a single request (dict) with the given data structure
+     - serve            Serves the data structure on a Unix socket until interrupted (or in a background thread)
+"""
+
+import os
+import json
+import inspect
+import time
+import threading
+import socketserver
+import numpy as np
+import data_methods as dm
+import optimizers as opt
+import evaluation as eval
+from query_client import SOCKET_PATH
+
+
+def _elevations(data, server, coordinates):
+    coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    [xs, ys] = dm.coords_to_index_batch(coordinates[:, 0], coordinates[:, 1], data)
+    return dm.get_fitness_batch(data, xs, ys)
+
+
+def _region_top_k(data, server, x1, y1, x2, y2, k=1):
+    if k == 1:
+        if server.pyramid is None:
+            server.pyramid = dm.load_max_pyramid(data)
+        top_cell = opt.brute_force_region(data, x1, y1, x2, y2, server.pyramid)
+        return [top_cell] if top_cell[1] is not None else []
+    return opt.brute_force_region(data, x1, y1, x2, y2, top_k=k)
+
+
+def _optimize(data, server, optimizer, parameters=None, seed=None, vectorized=True, max_evaluations=None,
+              max_time=None):
+    budget = None
+    if max_evaluations is not None or max_time is not None:
+        budget = opt.Budget(max_evaluations, max_time)
+    start = time.time()
+    [best, count] = eval.run_optimizer(data, optimizer, parameters or {}, seed, vectorized, budget)
+    end = time.time()
+    return [best, count, (end-start)*1000]
+
+
+def _info(data, server):
+    return {"shape": dm.data_shape(data), "geometry": dm.grid_geometry(data)}
+
+
+# Methods of the protocol
+_METHODS = {"elevations": _elevations, "region_top_k": _region_top_k, "optimize": _optimize, "info": _info}
+
+# Optimizer functions of evaluation.run_optimizer, for the parameter check of optimize requests
+_OPTIMIZERS = {"bf": opt.brute_force, "prs": opt.pure_random_search, "hc": opt.hill_climbing,
+               "pso": opt.particle_swarm_optimization, "mrs": opt.multi_resolution_search,
+               "sa": opt.simulated_annealing, "de": opt.differential_evolution}
+
+
+def _check_request(request):
+    """
+    Checks a request before it is answered (and before the lock of the server is taken): it must be an object with a
+    known method and a params object. The parameters of an optimize request must fit the optimizer function, plotting
+    is not allowed.
+    :param request: decoded JSON line
+    :return: error message, None if the request is valid
+    """
+    if not isinstance(request, dict):
+        return "Request must be a JSON object, got " + type(request).__name__
+    if request.get("method") not in _METHODS:
+        return "Unknown method: " + str(request.get("method"))
+    params = request.get("params", {})
+    if not isinstance(params, dict):
+        return "params must be a JSON object, got " + type(params).__name__
+
+    if request["method"] == "optimize":
+        function = _OPTIMIZERS.get(params.get("optimizer"))
+        if function is None:
+            return "Unknown optimizer: " + str(params.get("optimizer"))
+        parameters = params.get("parameters") or {}
+        if not isinstance(parameters, dict):
+            return "parameters must be a JSON object, got " + type(parameters).__name__
+        try:
+            inspect.signature(function).bind(None, **parameters)
+        except TypeError as error:
+            return "Invalid parameters for " + params["optimizer"] + ": " + str(error)
+        # Plots would be drawn (and possibly shown) while the server lock is held
+        if parameters.get("plot_enable", False) is not False:
+            return "plot_enable is not supported by the query server"
+
+    return None
+
+
+def _to_json(value):
+    """
+    Converts numpy values for json.dumps.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("Not serializable: " + type(value).__name__)
+
+
+def handle_request(data, request, server):
+    """
+    Answers a single request. Invalid requests and errors of the method are answered with an error response, so the
+    connection (and the responses of pipelined requests) go on.
+    :param data: data structure
+    :param request: request {"id": ..., "method": ..., "params": {...}}
+    :param server: QueryServer (holds the max pyramid once it is loaded, and the lock)
+    :return: response {"id": ..., "result": ...} or {"id": ..., "error": "..."}
+    """
+    request_id = request.get("id") if isinstance(request, dict) else None
+    error = _check_request(request)
+    if error is not None:
+        return {"id": request_id, "error": error}
+
+    # Requests of all connections one after the other: wrappers (memo, oracle) and the random module of the optimizers
+    # are not thread safe
+    try:
+        with server.lock:
+            result = _METHODS[request["method"]](data, server, **request.get("params", {}))
+    except Exception as error:
+        return {"id": request_id, "error": type(error).__name__ + ": " + str(error)}
+
+    return {"id": request_id, "result": result}
+
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    """
+    Answers the requests of one connection, line by line and in order.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                response = {"id": None, "error": "Invalid JSON: " + str(error)}
+            else:
+                response = handle_request(self.server.data, request, self.server)
+            self.wfile.write((json.dumps(response, default=_to_json) + "\n").encode())
+
+
+class QueryServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Unix socket server holding the data structure. Every connection gets its own thread, requests are answered one at
+    a time. The socket file is removed when the server is closed.
+    """
+    daemon_threads = True
+
+    def __init__(self, data, socket_path=SOCKET_PATH):
+        """
+        :param data: data structure
+        :param socket_path: path to the Unix socket (a leftover socket file is replaced)
+        """
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.data = data
+        self.pyramid = None
+        self.lock = threading.Lock()
+        super().__init__(socket_path, _QueryHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def serve(data, socket_path=SOCKET_PATH, background=False):
+    """
+    Serves the data structure on a Unix socket.
+    :param data: data structure (loaded once, e.g. dm.load_grid or dm.open_grid_memmap)
+    :param socket_path: path to the Unix socket
+    :param background: if True, the server runs in a background thread and is returned (stop it with shutdown() and
+                       server_close()), otherwise serves until interrupted (Ctrl+C)
+    :return: QueryServer if background, else None
+    """
+    server = QueryServer(data, socket_path)
+
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    print("QUERY SERVER STARTED on " + socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print("QUERY SERVER STOPPED")
+
+
+if __name__ == "__main__":
+    serve(dm.open_grid_memmap())
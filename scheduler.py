@@ -0,0 +1,159 @@
+"""
+    This python file runs a queue of optimizer jobs concurrently. An asyncio event loop hands the jobs to a process pool
+    (at most max_concurrent jobs at once) and streams progress events of the running jobs: best-so-far, number of
+    fitness evaluations used and elapsed time. Jobs which are clearly losing can be cancelled.
+
+    Jobs run through evaluation.run_optimizer with an opt.Budget whose callback reports the progress, so the engines
+    with budget support are used (non vectorized engines, mrs, sa, de). Workers map the binary grid cache
+    (dm.open_grid_memmap) instead of receiving a pickled copy of the data structure.
+     - run_jobs         Runs a list of jobs and returns their results (coroutine: asyncio.run(run_jobs(jobs)))
+     - print_event      Default event handler, prints one line per event
+
+    Job:    {"optimizer": "hc", "parameters": {"restart": 1000}, "seed": 1, "max_evaluations": None, "max_time": None}
+            (only optimizer is required, see evaluation.run_optimizer)
+    Event:  {"event": "started" / "progress" / "finished" / "cancelled", "job": index of the job, "optimizer": ...,
+             "evaluations": ..., "time_ms": ..., "best": ...}
+"""
+
+import time
+import queue
+import asyncio
+import concurrent.futures
+import data_methods as dm
+import optimizers as opt
+import evaluation as eval
+
+# State of a worker process: event queue and ids of the jobs to cancel (shared with the event loop)
+_worker_events = None
+_worker_cancelled = None
+
+
+def _attach_worker(events, cancelled):
+    """
+    Process pool initializer: maps the binary grid cache (dm.attach_worker_grid) and keeps the shared event queue and
+    cancel flags.
+    """
+    global _worker_events, _worker_cancelled
+    dm.attach_worker_grid()
+    _worker_events = events
+    _worker_cancelled = cancelled
+
+
+def _run_job(index, job, progress_interval):
+    """
+    Runs a single job in a worker process. Progress events are put into the event queue by the budget callback, which
+    also stops the run when the job is cancelled.
+    :param index: index of the job
+    :param job: job dict, see module description
+    :param progress_interval: minimum time between two progress events in ms
+    :return: [highest altitude found, number of fitness evaluations, time in ms, cancelled (True/False)]
+    """
+
+    def report(budget):
+        _worker_events.put({"event": "progress", "job": index, "optimizer": job["optimizer"],
+                            "evaluations": budget.evaluations, "time_ms": budget.elapsed(), "best": budget.best})
+        if index in _worker_cancelled:
+            budget.stop()
+
+    budget = opt.Budget(job.get("max_evaluations"), job.get("max_time"), report, progress_interval)
+    start = time.time()
+    [best, count] = eval.run_optimizer(dm.worker_grid(), job["optimizer"], job.get("parameters", {}), job.get("seed"),
+                                       False, budget)
+    end = time.time()
+    return [best, count, (end-start)*1000, budget.stopped]
+
+
+def print_event(event):
+    """
+    Prints one line per event.
+    :param event: event dict, see module description
+    :return: None
+    """
+    line = "Job " + str(event["job"]) + " (" + event["optimizer"].upper() + ") " + event["event"]
+    if event["event"] != "started":
+        line += ": best " + str(event["best"]) + ", evaluations " + str(event["evaluations"]) + ", time in ms " + \
+                str(round(event["time_ms"], 1))
+    print(line)
+
+
+async def run_jobs(jobs, max_concurrent=None, on_event=print_event, cancel_margin=None, cancel_after=1000,
+                   progress_interval=100):
+    """
+    Runs optimizer jobs in a process pool, at most max_concurrent at once, in the order of the list. Every event
+    (job started, progress, finished or cancelled) is passed to on_event while the jobs run.
+    Losing jobs: if cancel_margin is set, a running job is cancelled as soon as it has run for cancel_after ms and its
+    best-so-far is more than cancel_margin below the best altitude found by any job. It stops at its next budget
+    update and its best-so-far is its result.
+    :param jobs: list of job dicts, see module description
+    :param max_concurrent: maximum number of jobs running at once (None: number of CPUs)
+    :param on_event: function called with every event (None: no events)
+    :param cancel_margin: altitude difference in m at which a job is losing (None: no job is cancelled)
+    :param cancel_after: minimum running time of a job in ms before it can be cancelled
+    :param progress_interval: minimum time between two progress events of a job in ms
+    :return: list of [highest altitude found, number of fitness evaluations, time in ms, cancelled], in order of jobs
+    """
+
+    # Make sure the cache (and the max pyramid for mrs) exists before the workers map it, so they do not build it at once
+    grid = dm.open_grid_memmap()
+    if any(job["optimizer"] == "mrs" for job in jobs):
+        dm.load_max_pyramid(grid)
+
+    context = dm.process_context()
+    if max_concurrent is None:
+        max_concurrent = context.cpu_count()
+
+    # Initialize vars
+    loop = asyncio.get_running_loop()
+    results = [None] * len(jobs)
+    best_list = [0] * len(jobs)
+    pending = asyncio.Queue()
+    for index in range(len(jobs)):
+        pending.put_nowait(index)
+
+    def emit(event):
+        if on_event is not None:
+            on_event(event)
+
+    with context.Manager() as manager:
+        events = manager.Queue()
+        cancelled = manager.dict()
+
+        with concurrent.futures.ProcessPoolExecutor(max_concurrent, context, _attach_worker,
+                                                    (events, cancelled)) as executor:
+
+            async def worker():
+                # Takes the next job as soon as its last one is finished
+                while not pending.empty():
+                    index = pending.get_nowait()
+                    emit({"event": "started", "job": index, "optimizer": jobs[index]["optimizer"]})
+                    result = await loop.run_in_executor(executor, _run_job, index, jobs[index], progress_interval)
+                    results[index] = result
+                    best_list[index] = max(best_list[index], result[0])
+                    emit({"event": "cancelled" if result[3] else "finished", "job": index,
+                          "optimizer": jobs[index]["optimizer"], "evaluations": result[1], "time_ms": result[2],
+                          "best": result[0]})
+
+            workers = asyncio.gather(*[worker() for i in range(min(max_concurrent, len(jobs)))])
+
+            # Stream progress events until all jobs are finished
+            while not workers.done() or not events.empty():
+                try:
+                    event = await loop.run_in_executor(None, events.get, True, 0.05)
+                except queue.Empty:
+                    continue
+
+                # Late progress of a job which is already finished
+                index = event["job"]
+                if results[index] is not None:
+                    continue
+                best_list[index] = event["best"]
+                emit(event)
+
+                # Cancel the job if it is clearly losing
+                if cancel_margin is not None and event["time_ms"] >= cancel_after and index not in cancelled and \
+                        event["best"] + cancel_margin < max(best_list):
+                    cancelled[index] = True
+
+            await workers
+
+    return results
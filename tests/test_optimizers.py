@@ -0,0 +1,24 @@
+import numpy as np
+import data_methods as dm
+import optimizers as opt
+
+
+def _synthetic_grid():
+    """
+    Grid with the DHM200 shape and several hills, so that hill climbing particles find better neighbours.
+    """
+    rows = dm.RANDOM_Y_INDEX_MAX + 2
+    columns = dm.RANDOM_X_INDEX_MAX + 2
+    [x, y] = np.meshgrid(np.arange(columns), np.arange(rows))
+    grid = 1000 + 500 * np.sin(x / 40.0) * np.cos(y / 30.0) + 2000 * np.exp(-((x - 950) ** 2 + (y - 207) ** 2) / 5e4)
+    return grid.astype(np.float32)
+
+
+def test_swarm_personal_bests_stay_ahead_of_fitness():
+    data = _synthetic_grid()
+    rng = np.random.default_rng(1)
+    swarm = opt._swarm_initialize(data, 50, 10, rng)
+    for m in range(30):
+        opt._swarm_time_step(data, swarm, [0, 0], 3, 3, 2, True, 10)
+        assert np.all(swarm["pm_best_fitness"] >= swarm["fitness"])
+        assert swarm["f_global"] == swarm["pm_best_fitness"].max()
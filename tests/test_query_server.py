@@ -0,0 +1,32 @@
+import threading
+import numpy as np
+import query_server
+
+
+class _Server:
+    def __init__(self):
+        self.pyramid = None
+        self.lock = threading.Lock()
+
+
+_PSO_PARAMETERS = {"number_of_particles": 5, "time_steps": 2, "v_inertia": [0, 0], "v_best_global": 3,
+                   "v_best_local": 3, "v_swarm_center": 2, "enable_hc": False, "number_of_hc_elements": 1}
+
+
+def _optimize_request(plot_enable):
+    parameters = dict(_PSO_PARAMETERS, plot_enable=plot_enable)
+    return {"id": 1, "method": "optimize", "params": {"optimizer": "pso", "parameters": parameters, "seed": 1}}
+
+
+def test_optimize_rejects_plot_enable():
+    server = _Server()
+    for plot_enable in [True, []]:
+        response = query_server.handle_request(np.zeros((10, 10)), _optimize_request(plot_enable), server)
+        assert response["id"] == 1
+        assert "plot_enable" in response["error"]
+
+
+def test_optimize_without_plotting():
+    response = query_server.handle_request(np.ones((10, 10)), _optimize_request(False), _Server())
+    assert "error" not in response
+    assert len(response["result"]) == 3